@@ -0,0 +1,87 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.columns.column_types import BigInt, Text
+from piccolo.columns.indexes import IndexMethod
+
+ID = "2026-10-18T12:00:00:000000"
+VERSION = "0.111.1"
+DESCRIPTION = "Add SongLog title, author and uri"
+
+
+async def forwards() -> MigrationManager:
+    manager = MigrationManager(
+        migration_id=ID, app_name="vibr", description=DESCRIPTION
+    )
+
+    manager.add_column(
+        table_class_name="SongLog",
+        tablename="song_log",
+        column_name="title",
+        db_column_name="title",
+        column_class_name="Text",
+        column_class=Text,
+        params={
+            "default": "",
+            "null": False,
+            "primary_key": False,
+            "unique": False,
+            "index": False,
+            "index_method": IndexMethod.btree,
+            "choices": None,
+            "db_column_name": None,
+            "secret": False,
+        },
+    )
+
+    manager.add_column(
+        table_class_name="SongLog",
+        tablename="song_log",
+        column_name="author",
+        db_column_name="author",
+        column_class_name="Text",
+        column_class=Text,
+        params={
+            "default": "",
+            "null": False,
+            "primary_key": False,
+            "unique": False,
+            "index": False,
+            "index_method": IndexMethod.btree,
+            "choices": None,
+            "db_column_name": None,
+            "secret": False,
+        },
+    )
+
+    manager.add_column(
+        table_class_name="SongLog",
+        tablename="song_log",
+        column_name="uri",
+        db_column_name="uri",
+        column_class_name="Text",
+        column_class=Text,
+        params={
+            "default": None,
+            "null": True,
+            "primary_key": False,
+            "unique": False,
+            "index": False,
+            "index_method": IndexMethod.btree,
+            "choices": None,
+            "db_column_name": None,
+            "secret": False,
+        },
+    )
+
+    # Autocomplete loads a user's plays, which the unique index cannot find.
+    manager.alter_column(
+        table_class_name="SongLog",
+        tablename="song_log",
+        column_name="user_id",
+        db_column_name="user_id",
+        params={"index": True},
+        old_params={"index": False},
+        column_class=BigInt,
+        old_column_class=BigInt,
+    )
+
+    return manager
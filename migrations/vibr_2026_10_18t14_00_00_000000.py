@@ -0,0 +1,23 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.table import Table
+
+ID = "2026-10-18T14:00:00:000000"
+VERSION = "0.111.1"
+DESCRIPTION = "Add composite index to PlaylistToSong for paging"
+
+
+async def forwards() -> MigrationManager:
+    manager = MigrationManager(migration_id=ID, app_name="", description=DESCRIPTION)
+
+    async def composite_index() -> None:
+        class RawTable(Table):
+            ...
+
+        await RawTable.raw(
+            "CREATE INDEX IF NOT EXISTS playlist_to_song_playlist_added_id "
+            "ON playlist_to_song (playlist, added, id);"
+        )
+
+    manager.add_raw(composite_index)
+
+    return manager
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from base64 import b64encode
+
+from mafic import Track
+
+from vibr.player import Queue
+
+
+def make_track(number: int) -> Track:
+    return Track(
+        track_id=b64encode(f"track-{number}".encode()).decode(),
+        identifier=str(number),
+        seekable=True,
+        author="Artist",
+        length=1000,
+        stream=False,
+        title=f"Track {number}",
+        uri=f"https://example.com/{number}",
+        artwork_url=None,
+        isrc=None,
+        source="youtube",
+    )
+
+
+def test_play_now_takes_inserted_track_with_shuffle_on_play() -> None:
+    queue = Queue(maxlen=100)
+    queue.extend([(make_track(number), 1) for number in range(50)])
+    queue.shuffle_on_play = True
+
+    requested = make_track(100)
+    queue.insert_many(0, [(requested, 2)])
+    track, user = queue.skip(1, front=True)
+
+    assert track.id == requested.id
+    assert user == 2  # noqa: PLR2004
+    assert len(queue) == 50  # noqa: PLR2004
+
+
+def test_skip_removes_tracks_in_front_with_shuffle_on_play() -> None:
+    queue = Queue(maxlen=100)
+    tracks = [make_track(number) for number in range(50)]
+    queue.extend([(track, 1) for track in tracks])
+    queue.shuffle_on_play = True
+
+    queue.skip(5)
+
+    # The first four are skipped, the one played is any of the rest.
+    remaining = {track.id for track in queue}
+    assert len(remaining) == 45  # noqa: PLR2004
+    assert remaining.isdisjoint(track.id for track in tracks[:4])
+
+
+def test_previous_keeps_tracks_in_queue_loop() -> None:
+    queue = Queue(maxlen=100)
+    before, previous, current, after = (make_track(number) for number in range(4))
+    for track in (before, previous, current):
+        queue.history.push(track, 1)
+    queue.add(after, 1)
+    queue.loop_queue()
+
+    track, user = queue.previous()
+    assert track.id == previous.id
+    # What `Player.play` does with each track.
+    queue.history.push(track, user)
+    while queue:
+        queue.history.push(*queue.take())
+
+    looped = [queue.take()[0].id for _ in range(3)]
+    assert looped == [previous.id, current.id, after.id]
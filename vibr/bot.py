@@ -32,14 +32,23 @@ from vibr.db import PlayerConfig
 from vibr.db.node import Node
 from vibr.embed import Embed, ErrorEmbed
 from vibr.errors import NotInSameVoice
+from vibr.lazy_playlist import SPOTIFY_PLAYLIST_RE, fetch_spotify_playlist
+from vibr.node_selector import NodeSelector
+from vibr.outbox import outbox
+from vibr.play_index import PlayIndex
 from vibr.sharding import CURRENT_CLUSTER, TOTAL_SHARDS, shard_ids
 from vibr.sharding import client as docker_client
+from vibr.snapshots import PlayerSnapshots
+from vibr.track_cache import TrackCache
+from vibr.track_decoder import TrackDecoder
 from vibr.track_embed import track_embed
+from vibr.urls import parse_url
 from vibr.utils import truncate
+from vibr.write_behind import command_log, song_log
 
 from . import errors
 from .exts.playing._errors import LyricsNotFound, SongNotProvided
-from .player import Player
+from .player import MAX_QUEUE_LENGTH, Player
 
 if TYPE_CHECKING:
     from typing import TypedDict
@@ -85,6 +94,8 @@ class Vibr(BotBase):
             log_channel=LOG_CHANNEL,
             guild_ids=GUILD_IDS,
             log_guilds=True,
+            # Logged in batches by the write behind cog instead.
+            log_commands=False,
             intents=Intents(guilds=True, voice_states=True),
             member_cache_flags=MemberCacheFlags.none(),
             connector=TCPConnector(limit=1000),
@@ -93,6 +104,7 @@ class Vibr(BotBase):
         )
 
         self.pool = NodePool(self)
+        self.search_nodes = NodeSelector(self.pool)
 
         auth = ClientCredentialsFlow(
             application_id=environ["SPOTIFY_CLIENT_ID"],
@@ -104,6 +116,10 @@ class Vibr(BotBase):
             token_renew_instance=TokenRenewClass(),
         )
         self.redis = redis.from_url(environ["REDIS_URL"])
+        self.snapshots = PlayerSnapshots(self)
+        self.tracks = TrackCache(self)
+        self.decoder = TrackDecoder(self)
+        self.play_index = PlayIndex()
 
         self.nodes_connected = Event()
         self.gc_lock = Lock()
@@ -234,6 +250,18 @@ class Vibr(BotBase):
         )
 
     async def close(self) -> None:
+        try:
+            await self.snapshots.flush()
+        except Exception:
+            log.warning("Failed to flush player snapshots", exc_info=True)
+
+        for buffer in (song_log, command_log):
+            try:
+                await buffer.flush()
+            except Exception:
+                log.warning("Failed to flush %s", buffer.name, exc_info=True)
+
+        outbox.close()
         await self.redis.close()
         await self.pool.close()
 
@@ -351,9 +379,20 @@ class Vibr(BotBase):
             inter.channel
         )  # pyright: ignore[reportGeneralTypeIssues]
 
-        result = await player.fetch_tracks(
-            query=query, search_type=SearchType(search_type)
-        )
+        result = None
+        if (link := parse_url(query)) is not None:
+            query = link.url
+
+        if match := SPOTIFY_PLAYLIST_RE.match(query):
+            # Queue placeholders straight away, they are loaded as they come up.
+            result = await fetch_spotify_playlist(
+                self, match.group("id"), limit=MAX_QUEUE_LENGTH + 1
+            )
+
+        if result is None:
+            result = await self.tracks.fetch_tracks(
+                None, query, search_type=SearchType(search_type).value
+            )
         if not result:
             raise errors.NoTracksFound
 
@@ -367,16 +406,16 @@ class Vibr(BotBase):
 
         if player.current is None:
             queued = tracks[1:]
-            await player.play(track)
+            await player.play(track, requester=inter.user.id)
 
             embed, view = await track_embed(item, user=inter.user.id)
 
             if queued:
+                items = [(track, inter.user.id) for track in queued]
                 if type == "Next":
-                    for i in tracks[::-1]:
-                        player.queue.insert(0, i, inter.user.id)
+                    player.queue.insert_many(0, items)
                 else:
-                    player.queue += [(track, inter.user.id) for track in queued]
+                    player.queue += items
         elif type == "Next":
             embed, view = await self.handle_play_next(
                 player=player, inter=inter, item=item, tracks=tracks
@@ -386,14 +425,20 @@ class Vibr(BotBase):
                 player=player, inter=inter, item=item, tracks=tracks
             )
         else:
-            player.queue += [(track, inter.user.id) for track in tracks]
-            length = len(player.queue)
-            embed, view = await track_embed(item, user=inter.user.id, queued=length)
+            # Not the end of the queue with fair share.
+            position = player.queue.extend([(track, inter.user.id) for track in tracks])
+            starts_in = player.queue.time_until(position) + max(
+                (player.current.length or 0) - player.position, 0
+            )
+            embed, view = await track_embed(
+                item, user=inter.user.id, queued=position + 1, starts_in=starts_in
+            )
+
+        player.resolver.schedule()
 
-        m = await inter.send(
+        await inter.send(
             embed=embed, view=view
         )  # pyright: ignore[reportGeneralTypeIssues]
-        view.message = m
 
     async def handle_play_now(
         self,
@@ -403,11 +448,10 @@ class Vibr(BotBase):
         item: Track | Playlist,
         tracks: list[Track],
     ) -> tuple[Embed, PlayButtons]:
-        for i in tracks[::-1]:
-            player.queue.insert(0, i, inter.user.id)
-        track, user = player.queue.skip(1)
+        player.queue.insert_many(0, [(track, inter.user.id) for track in tracks])
+        track, user = player.queue.skip(1, front=True)
         embed, view = await track_embed(item, user=user)
-        await player.play(track)
+        await player.play(track, requester=user)
 
         return embed, view
 
@@ -419,8 +463,7 @@ class Vibr(BotBase):
         item: Track | Playlist,
         tracks: list[Track],
     ) -> tuple[Embed, PlayButtons]:
-        for i in tracks[::-1]:
-            player.queue.insert(0, i, inter.user.id)
+        player.queue.insert_many(0, [(track, inter.user.id) for track in tracks])
         embed, view = await track_embed(item, user=inter.user.id, queued=1)
         return embed, view
 
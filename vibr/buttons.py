@@ -2,281 +2,321 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, cast
 
-from mafic import Playlist, Track
+from mafic import Playlist, SearchType, Track
 from nextcord import ButtonStyle
 from nextcord.abc import Snowflake
-from nextcord.ui import Button, Select, View
-from nextcord import Message
+from nextcord.ui import Button, View
+
 from vibr.checks import voted_predicate
 from vibr.database import add_to_liked
 from vibr.embed import Embed, ErrorEmbed
 from vibr.errors import NotVoted
 from vibr.exts.playing._errors import LyricsNotFound
-from vibr.inter import Inter
-from vibr.patches.nextcord.ui import button
+from vibr.track_store import track_key
+from vibr.urls import get_uri
 
 from .exts.queue._views import QueueMenu, QueueSource
 
 if TYPE_CHECKING:
-    from nextcord import PartialInteractionMessage
+    from collections.abc import Callable, Coroutine
+    from typing import Any
 
+    from vibr.inter import Inter
+    from vibr.player import Player
 
-class TimeoutView(View):
-    message: Message | PartialInteractionMessage | None = None
+    Handler = Callable[[Inter, Player, list[str]], Coroutine[Any, Any, None]]
 
-#    async def on_timeout(self) -> None:
-#        self.stop()
-#
-#        for child in self.children:
-#            if isinstance(child, Button | Select):
-#                child.disabled = True
-#
-#        if self.message is not None:
-#            if isinstance(self.message, Message):
-#                if hasattr(self.message,'channel') and hasattr(self.message.channel,'permissions_for') and hasattr(self.message.guild,'me'):
-#                    perms = self.message.channel.permissions_for(self.message.guild.me)
-#                    if not perms.view_channel or not perms.send_messages:
-#                        return
-#
-#            await self.message.edit(view=self)
+__all__ = ("PREFIX", "PlayButtons", "press")
 
+PREFIX = "player:"
 
 MULTI_LOOP = "<:loopall:1044708055234904094>"
 SINGLE_LOOP = "<:loop:1044708068639903907>"
 
-class LyricsButton(Button):
-    def __init__(self,track: Track | None):
-        super().__init__(emoji="<:lyrics:1114702495722262669>", style=ButtonStyle.blurple, row=1)
-        self.track = track
-
-    async def callback(self,inter: Inter) -> None:
-        try:
-            await voted_predicate(inter)
-        except NotVoted as e:
-            await inter.send(embed=e.embed, view=e.embed.view, ephemeral=True)
-            return
-
-        if self.track is None or self.track.title is None:
-            await inter.send("No track available to fetch lyrics.", ephemeral=True)
-            return
-
-        try:
-            await inter.client.lyrics(inter, self.track.title)
-        except LyricsNotFound as e:
-            await inter.send(embed=e.embed, view=e.embed.view, ephemeral=True)
-
-class ShuffleButton(Button):
-    def __init__(self):
-        super().__init__(emoji="<:shuffle:1044699214803894293>", style=ButtonStyle.blurple, row=1)
-
-    async def callback(self, inter: Inter) ->None:
-        player = inter.guild.voice_client
-
-        if not player.current:
-            await inter.send_embed(
-                "No Song", "There is no song playing!", ephemeral=True
-            )
-            return
+# Loop button states, each one's emoji, style and the state a press moves to.
+LOOP_STATES = {
+    "off": (MULTI_LOOP, ButtonStyle.blurple, "track"),
+    "track": (SINGLE_LOOP, ButtonStyle.blurple, "once"),
+    "once": (MULTI_LOOP, ButtonStyle.grey, "off"),
+}
+
+
+class PlayButtons(View):
+    """The player controls under a track embed.
+
+    Each button's ``custom_id`` holds what it does and the
+    :func:`~vibr.track_store.track_key` of the track, and presses are handled
+    by :func:`press` with the guild's player at the time. Nothing is kept for
+    the message, the view is not stored by nextcord and never times out.
+
+    Parameters
+    ----------
+    item:
+        The track or playlist the embed shows.
+    loop:
+        The state of the loop button.
+    """
 
-        player.queue.shuffle()
-        embed = Embed(title="Shuffled the queue")
-        await inter.send(embed=embed)
-        return
-    
-class PlayButtons(TimeoutView):
     def __init__(
-        self,
-        track: Track | Playlist | None,
-        *,
-        loop: bool = False,
+        self, item: Track | Playlist | str | None, *, loop: str = "off"
     ) -> None:
-        super().__init__(timeout=60 * 5)
+        super().__init__(timeout=None, prevent_update=False)
 
-        if isinstance(track, Track):
-            self.track = track
+        # The key is passed instead when redrawn after a press.
+        if isinstance(item, str):
+            key = item
+        elif isinstance(item, Track):
+            key = track_key(item)
         else:
-            self.track = None
-
-        if loop:
-            self.loop.emoji = MULTI_LOOP
-            self.loop.style = ButtonStyle.grey
+            key = ""
 
-        if isinstance(track, Playlist):
-            self.add_item(
-                ShuffleButton()
-            )
-        else:
+        loop_emoji, loop_style, _ = LOOP_STATES[loop]
+        last = (
+            ("<:lyrics:1114702495722262669>", f"lyrics:{key}")
+            if key
+            else ("<:shuffle:1044699214803894293>", "shuffle")
+        )
+        buttons = (
+            ("<:playpause:1044619888146255975>", ButtonStyle.blurple, "playpause", 0),
+            ("<:stop:1044661767504134164>", ButtonStyle.blurple, "stop", 0),
+            ("<:skip:1044620351390363739>", ButtonStyle.blurple, "skip", 0),
+            (loop_emoji, loop_style, f"loop:{loop}:{key}", 0),
+            ("<:queue:1044702819992748138>", ButtonStyle.blurple, "queue", 1),
+            ("<:vibrheart:1044662164587290664>", ButtonStyle.blurple, f"like:{key}", 1),
+            ("<:remove:1114702473249161226>", ButtonStyle.blurple, f"remove:{key}", 1),
+            (last[0], ButtonStyle.blurple, last[1], 1),
+        )
+        for emoji, style, action, row in buttons:
             self.add_item(
-                LyricsButton(track)
+                Button(emoji=emoji, style=style, custom_id=PREFIX + action, row=row)
             )
 
 
-    async def interaction_check(self, inter: Inter) -> bool:
-        if not inter.guild or not inter.guild.voice_client:
-            embed = Embed(
-                title="Not in Voice",
-                description="The bot needs to be connected to a vc!",
-            )
-            await inter.send(embed=embed, ephemeral=True)
-            return False
-
-        if (
-            # User is not even in voice
-            not inter.user.voice
-            # Somehow they have a voice state but no channel?
-            or not inter.user.voice.channel
-            or inter.user.voice.channel.id
-            != cast(Snowflake, inter.guild.voice_client.channel).id
-        ):
-            embed = Embed(
-                title="Not in Voice",
-                description="You need to be in the same vc as the bot!",
-            )
-            await inter.send(embed=embed, ephemeral=True)
-            return False
+async def _check(inter: Inter) -> bool:
+    if not inter.guild or not inter.guild.voice_client:
+        embed = Embed(
+            title="Not in Voice",
+            description="The bot needs to be connected to a vc!",
+        )
+        await inter.send(embed=embed, ephemeral=True)
+        return False
+
+    if (
+        # User is not even in voice
+        not inter.user.voice
+        # Somehow they have a voice state but no channel?
+        or not inter.user.voice.channel
+        or inter.user.voice.channel.id
+        != cast(Snowflake, inter.guild.voice_client.channel).id
+    ):
+        embed = Embed(
+            title="Not in Voice",
+            description="You need to be in the same vc as the bot!",
+        )
+        await inter.send(embed=embed, ephemeral=True)
+        return False
 
-        return True
+    return True
 
-    @button(emoji="<:playpause:1044619888146255975>", style=ButtonStyle.blurple)
-    async def playpause(self, _: Button, inter: Inter) -> None:
-        player = inter.guild.voice_client
 
-        if player.current is None:
-            embed1 = ErrorEmbed(
-                title="No song Playing",
-                description="Use /play a song to use the command",
-            )
-            await inter.send(embed=embed1, ephemeral=True)
-            return
+async def _find_track(inter: Inter, player: Player, key: str) -> Track | None:
+    if not key:
+        return None
 
-        if player.paused is False:
-            await player.pause(pause=True)
-            embed = Embed(title="Paused")
-        else:
-            await player.resume()
-            await player.pause(pause=False)
-            embed = Embed(title="Resumed")
+    if (current := player.current) is not None and track_key(current) == key:
+        return current
 
-        await inter.send(embed=embed)
-        return
+    if (track := player.queue.history.find(key)) is not None:
+        return track
 
-    @button(emoji="<:stop:1044661767504134164>", style=ButtonStyle.blurple)
-    async def stop_(self, _: Button, inter: Inter) -> None:
-        player = inter.guild.voice_client
-        if player.current is None:
-            embed1 = ErrorEmbed(
-                title="No song Playing",
-                description="Use /play a song to use the command",
-            )
-            await inter.send(embed=embed1, ephemeral=True)
-            return
+    if (index := player.queue.find(key)) is not None:
+        return player.queue[index]
 
-        player.queue.clear()
-        await player.stop()
+    # The message outlived the player's history, so load the track again from
+    # the link in its embed. It is likely still cached from when it was played.
+    message = inter.message
+    if message is None or not message.embeds or not message.embeds[0].author.url:
+        return None
 
-        embed = Embed(
-            title="Stopped",
+    result = await inter.client.tracks.fetch_tracks(
+        None,
+        get_uri(message.embeds[0].author.url),
+        search_type=SearchType.YOUTUBE.value,
+    )
+    tracks = result.tracks if isinstance(result, Playlist) else result
+    # Liking another result would like a different track than the embed shows.
+    return next((track for track in tracks if track_key(track) == key), None)
+
+
+async def _playpause(inter: Inter, player: Player, _: list[str]) -> None:
+    if player.current is None:
+        embed1 = ErrorEmbed(
+            title="No song Playing",
+            description="Use /play a song to use the command",
         )
-        await inter.send(embed=embed)
+        await inter.send(embed=embed1, ephemeral=True)
         return
 
-    @button(emoji="<:skip:1044620351390363739>", style=ButtonStyle.blurple)
-    async def skip_(self, _: Button, inter: Inter) -> None:
-        from vibr.track_embed import track_embed
+    if player.paused is False:
+        await player.pause(pause=True)
+        embed = Embed(title="Paused")
+    else:
+        await player.resume()
+        await player.pause(pause=False)
+        embed = Embed(title="Resumed")
 
-        player = inter.guild.voice_client
+    await inter.send(embed=embed)
 
-        if not player.queue:
-            await player.stop()
-            embed = ErrorEmbed(title="Queue Empty",
-                               description="The queue is empty. Stopping the Player.")
-            return await inter.send(embed=embed)
 
-        track, user = player.queue.skip(1)
-        await player.play(track)
-        embed, view = await track_embed(track, user=user, skipped=inter.user.id)
-        m = await inter.response.send_message(embed=embed, view=view)
-        view.message = m
+async def _stop(inter: Inter, player: Player, _: list[str]) -> None:
+    if player.current is None:
+        embed1 = ErrorEmbed(
+            title="No song Playing",
+            description="Use /play a song to use the command",
+        )
+        await inter.send(embed=embed1, ephemeral=True)
         return
 
-    @button(emoji="<:queue:1044702819992748138>", style=ButtonStyle.blurple, row=1)
-    async def queue(self, _: Button, inter: Inter) -> None:
-        current = inter.guild.voice_client.current
-        queue = inter.guild.voice_client.queue
-
-        if not queue and not current:
-            embed = Embed(title="Queue is empty")
-            await inter.send(embed=embed)
-            return
-
-        menu = QueueMenu(source=QueueSource([current, *queue]), inter=inter)
-        await menu.start(interaction=inter)
-
-    @button(emoji=MULTI_LOOP, style=ButtonStyle.blurple, custom_id="view:loop")
-    async def loop(self, button: Button, inter: Inter) -> None:
-        player = inter.guild.voice_client
-
-        if not player.current:
-            embed = Embed(title="No song Playing")
-            await inter.send(embed=embed, ephemeral=True)
-            return
-
-        if button.style is ButtonStyle.blurple and str(button.emoji) == MULTI_LOOP:
-            player.queue.loop_track(player.current, user=inter.user.id)
-            button.emoji = SINGLE_LOOP
-            embed = Embed(title="Looping Current Track Infinitely")
-
-        elif button.style is ButtonStyle.blurple and str(button.emoji) == SINGLE_LOOP:
-            player.queue.loop_track_once(player.current, user=inter.user.id)
-            button.style = ButtonStyle.grey
-            embed = Embed(title="Switching Loop Type to Once")
-        else:
-            player.queue.disable_loop()
-            button.emoji = MULTI_LOOP
-            button.style = ButtonStyle.blurple
-            embed = Embed(title="Track Looping Disabled")
+    player.queue.clear()
+    await player.stop()
+
+    embed = Embed(
+        title="Stopped",
+    )
+    await inter.send(embed=embed)
+
 
-        await inter.edit(view=self)
+async def _skip(inter: Inter, player: Player, _: list[str]) -> None:
+    from vibr.track_embed import track_embed
+
+    player.queue.refill()
+    if not player.queue:
+        await player.stop()
+        embed = ErrorEmbed(
+            title="Queue Empty", description="The queue is empty. Stopping the Player."
+        )
         await inter.send(embed=embed)
+        return
 
-    @button(emoji="<:vibrheart:1044662164587290664>", style=ButtonStyle.blurple, row=1)
-    async def like(self, _: Button, inter: Inter) -> None:
-        existed = await add_to_liked(user=inter.user, track=self.track)
-        if existed:
-            await inter.send(
-                f"**{self.track.title}** is already in your liked playlist!"
-            )
+    track, user = player.queue.skip(1)
+    await player.play(track, requester=user)
+    embed, view = await track_embed(track, user=user, skipped=inter.user.id)
+    await inter.response.send_message(embed=embed, view=view)
 
-        else:
-            await inter.send(f"**{self.track.title}** added to your liked playlist!")
-
-
-    '''@button(emoji="<:lyrics:1114702495722262669>", style=ButtonStyle.blurple, row=1)
-    async def lyrics(self, _: Button, inter: Inter) -> None:
-        try:
-            await voted_predicate(inter)
-        except NotVoted as e:
-            await inter.send(embed=e.embed, view=e.embed.view, ephemeral=True)
-            return
-
-        if self.track is None or self.track.title is None:
-            await inter.send("No track available to fetch lyrics.", ephemeral=True)
-            return
-
-        try:
-            await inter.client.lyrics(inter, self.track.title)
-        except LyricsNotFound as e:
-            await inter.send(embed=e.embed, view=e.embed.view, ephemeral=True)'''
-
-    @button(emoji="<:remove:1114702473249161226>", style=ButtonStyle.blurple, row=1)
-    async def remove(self, _: Button, inter: Inter) -> None:
-        player = inter.guild.voice_client
-        try:
-            index = player.queue.index(self.track)
-            player.queue.pop(index)
-        except Exception:
-            await inter.send("This song is not in the queue", ephemeral=True)
-            return
-        embed = Embed(title=f"Removed **{self.track.title}** from the queue")
+
+async def _queue(inter: Inter, player: Player, _: list[str]) -> None:
+    if not player.queue and not player.current:
+        embed = Embed(title="Queue is empty")
         await inter.send(embed=embed)
         return
+
+    menu = QueueMenu(source=QueueSource(player), inter=inter)
+    await menu.start(interaction=inter)
+
+
+async def _loop(inter: Inter, player: Player, args: list[str]) -> None:
+    if not player.current:
+        embed = Embed(title="No song Playing")
+        await inter.send(embed=embed, ephemeral=True)
+        return
+
+    state, key = args
+    if state == "off":
+        player.queue.loop_track(player.current, user=inter.user.id)
+        embed = Embed(title="Looping Current Track Infinitely")
+    elif state == "track":
+        player.queue.loop_track_once(player.current, user=inter.user.id)
+        embed = Embed(title="Switching Loop Type to Once")
+    else:
+        player.queue.disable_loop()
+        embed = Embed(title="Track Looping Disabled")
+
+    await inter.edit(view=PlayButtons(key, loop=LOOP_STATES[state][2]))
+    await inter.send(embed=embed)
+
+
+async def _like(inter: Inter, player: Player, args: list[str]) -> None:
+    if (track := await _find_track(inter, player, args[0])) is None:
+        await inter.send("Could not find this track.", ephemeral=True)
+        return
+
+    existed = await add_to_liked(user=inter.user, track=track)
+    if existed:
+        await inter.send(f"**{track.title}** is already in your liked playlist!")
+    else:
+        await inter.send(f"**{track.title}** added to your liked playlist!")
+
+
+async def _remove(inter: Inter, player: Player, args: list[str]) -> None:
+    if (index := player.queue.find(args[0])) is None:
+        await inter.send("This song is not in the queue", ephemeral=True)
+        return
+
+    track = player.queue[index]
+    player.queue.pop(index)
+    embed = Embed(title=f"Removed **{track.title}** from the queue")
+    await inter.send(embed=embed)
+
+
+async def _lyrics(inter: Inter, player: Player, args: list[str]) -> None:
+    try:
+        await voted_predicate(inter)
+    except NotVoted as e:
+        await inter.send(embed=e.embed, view=e.embed.view, ephemeral=True)
+        return
+
+    track = await _find_track(inter, player, args[0])
+    if track is None or track.title is None:
+        await inter.send("No track available to fetch lyrics.", ephemeral=True)
+        return
+
+    try:
+        await inter.client.lyrics(inter, track.title)
+    except LyricsNotFound as e:
+        await inter.send(embed=e.embed, view=e.embed.view, ephemeral=True)
+
+
+async def _shuffle(inter: Inter, player: Player, _: list[str]) -> None:
+    if not player.current:
+        await inter.send_embed("No Song", "There is no song playing!", ephemeral=True)
+        return
+
+    player.queue.shuffle()
+    embed = Embed(title="Shuffled the queue")
+    await inter.send(embed=embed)
+
+
+HANDLERS: dict[str, Handler] = {
+    "playpause": _playpause,
+    "stop": _stop,
+    "skip": _skip,
+    "queue": _queue,
+    "loop": _loop,
+    "like": _like,
+    "remove": _remove,
+    "lyrics": _lyrics,
+    "shuffle": _shuffle,
+}
+
+
+async def press(inter: Inter, custom_id: str) -> None:
+    """Handle a press of one of the :class:`PlayButtons`.
+
+    Parameters
+    ----------
+    inter:
+        The button press.
+    custom_id:
+        The button's ``custom_id``, starting with ``PREFIX``.
+    """
+
+    action, *args = custom_id.removeprefix(PREFIX).split(":")
+    if (handler := HANDLERS.get(action)) is None:
+        return
+
+    try:
+        if await _check(inter):
+            await handler(inter, inter.guild.voice_client, args)
+    except Exception as e:  # noqa: BLE001
+        # Handled by the error handler like errors in commands.
+        inter.client.dispatch("player_button_error", inter, e)
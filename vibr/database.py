@@ -1,117 +1,249 @@
 from __future__ import annotations
 
-import functools
-from base64 import b64decode, b64encode
-from typing import TYPE_CHECKING, ParamSpec, TypeVar, cast
+from base64 import b64decode
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any, cast
 
 from asyncpg import UniqueViolationError
 
-from vibr.db import Playlist, PlaylistToSong, Song, User
+from vibr.db import Playlist, PlaylistToSong, Song
 from vibr.errors import MaxLiked
 
 if TYPE_CHECKING:
-    from collections.abc import Awaitable, Callable
-
     import nextcord
     from mafic import Track
     from nextcord import Member
-    from piccolo.columns import ForeignKey
     from piccolo.engine.postgres import PostgresTransaction
 
-P = ParamSpec("P")
-T = TypeVar("T")
-MAX_LIKED = 500
+    # `(added, id)` of a row in `playlist_to_song`, the order liked songs are in.
+    Cursor = tuple[datetime, int]
 
+__all__ = (
+    "END",
+    "MAX_LIKED",
+    "START",
+    "add_to_liked",
+    "liked_page",
+    "liked_playlist",
+    "liked_version",
+    "remove_from_liked",
+)
 
-def transaction(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
-    @functools.wraps(func)
-    async def wrapped(*args: P.args, **kwargs: P.kwargs) -> T:
-        db = User._meta.db
-        async with cast("PostgresTransaction", db.transaction()):
-            return await func(*args, **kwargs)
+MAX_LIKED = 500
 
-    return wrapped
+
+# Adds a song to a user's liked songs in one round trip, if they have the
+# playlist. Nothing is written if the song is already liked or the playlist is
+# full. A song liked twice at once is upserted twice, but the second link breaks
+# the unique constraint and rolls back its whole statement.
+ADD_TO_LIKED = """
+WITH params AS (
+    SELECT {}::bigint AS owner, {}::bytea AS lavalink_id, {}::integer AS max_liked
+), liked AS (
+    SELECT playlist.id FROM playlist, params
+    WHERE playlist.owner = params.owner AND playlist.name = 'Liked Songs'
+    ORDER BY playlist.id
+    LIMIT 1
+), counted AS (
+    SELECT count(*) AS songs FROM playlist_to_song
+    WHERE playlist = (SELECT id FROM liked)
+), already AS (
+    SELECT FROM playlist_to_song
+    JOIN song ON song.id = playlist_to_song.song
+    WHERE playlist_to_song.playlist = (SELECT id FROM liked)
+    AND song.lavalink_id = (SELECT lavalink_id FROM params)
+), upserted AS (
+    INSERT INTO song (lavalink_id)
+    SELECT lavalink_id FROM params
+    WHERE EXISTS (SELECT FROM liked)
+    AND NOT EXISTS (SELECT FROM already)
+    AND (SELECT songs FROM counted) < (SELECT max_liked FROM params)
+    ON CONFLICT (lavalink_id) DO UPDATE SET likes = song.likes + 1
+    RETURNING id
+), linked AS (
+    INSERT INTO playlist_to_song (playlist, song)
+    SELECT liked.id, upserted.id FROM liked, upserted
+)
+SELECT
+    NOT EXISTS (SELECT FROM liked) AS missing,
+    (SELECT songs FROM counted) >= (SELECT max_liked FROM params) AS at_limit,
+    EXISTS (SELECT FROM already) AS existed;
+"""
+# Every statement sees the rows committed when it started, so the lock is taken
+# first, and likes at the same time by a new user cannot each make a playlist.
+# Foreign keys are checked at the end of the statement, so the playlist can
+# reference the user inserted with it.
+CREATE_LIKED = """
+WITH params AS (
+    SELECT {}::bigint AS owner
+), ensured_user AS (
+    INSERT INTO users (id) SELECT owner FROM params ON CONFLICT (id) DO NOTHING
+)
+INSERT INTO playlist (name, owner)
+SELECT 'Liked Songs', owner FROM params
+WHERE NOT EXISTS (
+    SELECT FROM playlist, params
+    WHERE playlist.owner = params.owner AND playlist.name = 'Liked Songs'
+);
+"""
+LOCK_USER = "SELECT pg_advisory_xact_lock({});"
 
 
-@transaction
 async def add_to_liked(*, user: nextcord.User | Member, track: Track) -> bool:
-    # song = (
-    #     await Song.insert(
-    #         Song({Song.lavalink_id: b64decode(track.id)}),
-    #     )
-    #     .on_conflict(
-    #         (Song.id),
-    #         "DO UPDATE",
-    #         ((Song.likes, Unquoted("song.likes + 1")),),
-    #     )
-    #     .returning(*Song.all_columns())
-    # )[0]
-    # get count of liked songs by user
-    count = await PlaylistToSong.count().where(
-        (PlaylistToSong.playlist.owner.join_on(User.id).id == user.id)
-        & (PlaylistToSong.playlist.name == "Liked Songs")
-    )
-    if count >= MAX_LIKED:
-        raise MaxLiked
+    """Add a track to a user's liked songs.
 
-    song = Song.from_dict(
-        (
-            await Song.raw(
-                """INSERT INTO song (lavalink_id)
-                VALUES ({})
-                ON CONFLICT (lavalink_id) DO UPDATE SET likes = song.likes + 1
-                RETURNING *;
-                """,
-                b64decode(track.id),
-            )
-        )[0]
-    )
-    song._exists_in_db = True
-
-    owner = await User.objects().get_or_create(User.id == user.id)
-    playlist = await Playlist.objects().get_or_create(
-        (Playlist.name == "Liked Songs") & (Playlist.owner.id == owner.id),
-        defaults={
-            Playlist.owner: owner,
-        },
-    )
+    Returns
+    -------
+    bool
+        Whether the track was already liked.
+
+    Raises
+    ------
+    MaxLiked
+        The user already has ``MAX_LIKED`` liked songs.
+    """
 
+    lavalink_id = b64decode(track.id)
     try:
-        await playlist.add_m2m(song, m2m=Playlist.songs)
+        [result] = await Song.raw(ADD_TO_LIKED, user.id, lavalink_id, MAX_LIKED)
+        if result["missing"]:
+            # Their first like, which needs the user and playlist made first.
+            async with cast("PostgresTransaction", Song._meta.db.transaction()):
+                await Song.raw(LOCK_USER, user.id)
+                await Song.raw(CREATE_LIKED, user.id)
+
+            [result] = await Song.raw(ADD_TO_LIKED, user.id, lavalink_id, MAX_LIKED)
     except UniqueViolationError:
+        # Liked at the same time by another request, which linked it first.
         return True
 
-    return False
-
-
-@transaction
-async def remove_from_liked(*, user: nextcord.User | Member, index: int) -> str | None:
-    playlist_to_song = (
-        await PlaylistToSong.objects(PlaylistToSong.song, PlaylistToSong.playlist)
-        .where(
-            (cast("ForeignKey", PlaylistToSong.playlist.owner).id == user.id)
-            & (PlaylistToSong.playlist.name == "Liked Songs")
-        )
-        .offset(index)
-        .limit(1)
-        .order_by(PlaylistToSong.added)
-        .first()
+    if result["at_limit"]:
+        raise MaxLiked
+
+    return result["existed"]
+
+
+# Pages are found by the `(playlist, added, id)` index from the song next to
+# them, instead of counting past every song before them with an offset.
+LIKED_PAGE_AFTER = """
+SELECT playlist_to_song.id, playlist_to_song.added, song.id AS song, song.lavalink_id
+FROM playlist_to_song
+JOIN song ON song.id = playlist_to_song.song
+WHERE playlist_to_song.playlist = {}
+AND (playlist_to_song.added, playlist_to_song.id) > ({}, {})
+ORDER BY playlist_to_song.added, playlist_to_song.id
+LIMIT {};
+"""
+LIKED_PAGE_BEFORE = """
+SELECT playlist_to_song.id, playlist_to_song.added, song.id AS song, song.lavalink_id
+FROM playlist_to_song
+JOIN song ON song.id = playlist_to_song.song
+WHERE playlist_to_song.playlist = {}
+AND (playlist_to_song.added, playlist_to_song.id) < ({}, {})
+ORDER BY playlist_to_song.added DESC, playlist_to_song.id DESC
+LIMIT {};
+"""
+LIKED_PLAYLIST = """
+SELECT id FROM playlist
+WHERE owner = {} AND name = 'Liked Songs'
+ORDER BY id
+LIMIT 1;
+"""
+# Any add makes a newer row and any remove lowers the count, so these change
+# whenever the songs do.
+LIKED_VERSION = """
+SELECT count(*) AS songs, max(id) AS newest
+FROM playlist_to_song
+WHERE playlist = {};
+"""
+# Songs liked by nobody else are deleted, the rest lose a like. Both look at the
+# song as it was before the statement, so each song is only changed once.
+REMOVE_FROM_LIKED = """
+WITH removed AS (
+    DELETE FROM playlist_to_song
+    USING playlist
+    WHERE playlist_to_song.playlist = playlist.id
+    AND playlist.owner = {} AND playlist.name = 'Liked Songs'
+    AND playlist_to_song.song = {}
+    RETURNING playlist_to_song.song
+), unliked AS (
+    UPDATE song SET likes = likes - 1
+    WHERE id IN (SELECT song FROM removed) AND likes > 1
+    RETURNING lavalink_id
+), deleted AS (
+    DELETE FROM song
+    WHERE id IN (SELECT song FROM removed) AND likes <= 1
+    RETURNING lavalink_id
+)
+SELECT lavalink_id FROM unliked UNION ALL SELECT lavalink_id FROM deleted;
+"""
+# Before and after every `(added, id)`, to page from the first or last song.
+START: Cursor = (datetime.min.replace(tzinfo=UTC), 0)
+END: Cursor = (datetime.max.replace(tzinfo=UTC), 2**31 - 1)
+
+
+async def liked_page(
+    playlist: int,
+    *,
+    limit: int,
+    after: Cursor | None = None,
+    before: Cursor | None = None,
+) -> list[dict[str, Any]]:
+    """Get liked songs in the order they were added.
+
+    Parameters
+    ----------
+    playlist:
+        The ID of the liked songs playlist.
+    limit:
+        The most songs to get.
+    after:
+        The ``(added, id)`` of the song before the page.
+    before:
+        The ``(added, id)`` of the song after the page, used instead of
+        ``after`` if given.
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        The ``id``, ``added``, ``song`` ID and ``lavalink_id`` of each song.
+    """
+
+    if before is not None:
+        rows = await PlaylistToSong.raw(LIKED_PAGE_BEFORE, playlist, *before, limit)
+        return rows[::-1]
+
+    return await PlaylistToSong.raw(
+        LIKED_PAGE_AFTER, playlist, *(after or START), limit
     )
-    if playlist_to_song is None:
-        return None
 
-    song = playlist_to_song.song
-    playlist = playlist_to_song.playlist
 
-    if song is None:
-        return None
+async def liked_playlist(*, user: int) -> int | None:
+    """Get the ID of a user's liked songs playlist, if they have one."""
+
+    rows = await Playlist.raw(LIKED_PLAYLIST, user)
+    return rows[0]["id"] if rows else None
+
+
+async def liked_version(playlist: int) -> tuple[int, int | None]:
+    """Get the number of songs in a liked songs playlist and its newest row.
+
+    Both are found through the playlist's index, so this is cheap enough to
+    check on every keystroke whether songs kept from it are still current.
+    """
+
+    [row] = await PlaylistToSong.raw(LIKED_VERSION, playlist)
+    return row["songs"], row["newest"]
+
 
-    await playlist.remove_m2m(song, m2m=Playlist.songs)
+async def remove_from_liked(*, user: nextcord.User | Member, song: int) -> bytes | None:
+    """Remove a song from a user's liked songs.
 
-    song.likes -= 1
-    if song.likes == 0:
-        await song.remove()
-    else:
-        await song.save()
+    Returns
+    -------
+    bytes | None
+        The song's Lavalink ID, or ``None`` if it was not liked.
+    """
 
-    return b64encode(song.lavalink_id).decode()
+    rows = await Song.raw(REMOVE_FROM_LIKED, user.id, song)
+    return rows[0]["lavalink_id"] if rows else None
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from enum import Enum
 
-from piccolo.columns import BigInt, Integer, Serial, SmallInt, Text
+from piccolo.columns import BigInt, Integer, Serial, SmallInt, Text, Timestamptz
 from piccolo.table import Table
 
 
@@ -22,5 +22,9 @@ class SongLog(Table):
     id = Serial(primary_key=True)
     type = SmallInt(default=Type.OTHER, choices=Type)
     identifier = Text()
-    user_id = BigInt()
+    user_id = BigInt(index=True)
     amount = Integer()
+    title = Text(default="")
+    author = Text(default="")
+    uri = Text(null=True, default=None)
+    last_played = Timestamptz(index=True)
@@ -33,6 +33,10 @@ class ErrorHandler(CogBase[Vibr]):
             "vibr_unhandled_errors", "Unhandled errors"
         )
 
+    @CogBase.listener()
+    async def on_player_button_error(self, inter: Inter, exc: Exception) -> None:
+        await self.on_application_command_error(inter, exc)
+
     @CogBase.listener()
     async def on_application_command_error(self, inter: Inter, exc: Exception) -> None:
         if isinstance(exc, ApplicationInvokeError):
@@ -63,13 +67,13 @@ class ErrorHandler(CogBase[Vibr]):
             return
         else:
             self.unhandled_error_count.inc()
-            log.error(
-                "Unexpected error in command %s",
+            # Buttons have no command, their ID says what was pressed.
+            command = (
                 inter.application_command.qualified_name
                 if inter.application_command
-                else None,
-                exc_info=exc,
+                else (inter.data or {}).get("custom_id", "")
             )
+            log.error("Unexpected error in command %s", command, exc_info=exc)
             embed = ErrorEmbed(
                 title="Unexpected Error.",
                 description=(
@@ -84,12 +88,6 @@ class ErrorHandler(CogBase[Vibr]):
 
             if log_channel_id := self.bot.log_channel:
                 log_channel = await self.bot.getch_channel(log_channel_id)
-
-                command = (
-                    inter.application_command.qualified_name
-                    if inter.application_command
-                    else ""
-                )
                 guild = inter.guild.name if inter.guild is not None else "dm"
 
                 tb = "\n".join(format_exception(exc))
@@ -2,7 +2,13 @@ from vibr.bot import Vibr
 from vibr.embed import ErrorEmbed
 from vibr.errors import CheckFailure
 
-__all__ = ("NoTrackOrQuery", "NoPlaylists", "NoSongAtIndex", "NoLikedSongs")
+__all__ = (
+    "NoLikedSongs",
+    "NoPlaylists",
+    "NoSongAtIndex",
+    "NoSongNamed",
+    "NoTrackOrQuery",
+)
 
 
 class NoTrackOrQuery(CheckFailure):
@@ -31,6 +37,18 @@ class NoSongAtIndex(CheckFailure):
         )
 
 
+class NoSongNamed(CheckFailure):
+    def __init__(self, bot: Vibr) -> None:
+        self.embed = ErrorEmbed(
+            title="No Track Found",
+            description=(
+                "Could not find one liked song by that name. Pick one of the "
+                "suggestions, or remove it by its index from "
+                f"{bot.get_command_mention('liked list')}"
+            ),
+        )
+
+
 class NoLikedSongs(CheckFailure):
     def __init__(self, bot: Vibr) -> None:
         self.embed = ErrorEmbed(
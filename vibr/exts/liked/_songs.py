@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from os import getenv
+from typing import TYPE_CHECKING
+
+from cachetools import LRUCache
+
+from vibr.database import liked_page, liked_playlist, liked_version
+from vibr.utils import truncate
+
+if TYPE_CHECKING:
+    from mafic import Track
+
+    from vibr.bot import Vibr
+    from vibr.database import Cursor
+
+__all__ = ("LikedTitles",)
+
+CACHED_USERS = int(getenv("LIKED_TITLES_USERS", "1000"))
+PAGE_SIZE = 100
+
+
+def _name(track: Track) -> str:
+    return truncate(f"{track.title} by {track.author}", length=90)
+
+
+class LikedTitles:
+    """The ID and title of each of a user's liked songs, in order.
+
+    Titles are only in the encoded tracks, so each user's songs are decoded
+    once and kept until their playlist's song count or newest row changes.
+    Searching by name then covers every song without loading any per keystroke.
+    """
+
+    def __init__(self, bot: Vibr) -> None:
+        self.bot = bot
+        # Playlist ID, version and songs by user.
+        self._users: LRUCache[
+            int, tuple[int, tuple[int, int | None], list[tuple[int, str]]]
+        ] = LRUCache(maxsize=CACHED_USERS)
+
+    async def get(self, user: int) -> list[tuple[int, str]]:
+        """Get the song ID and title of each of ``user``'s liked songs."""
+
+        if (cached := self._users.get(user)) is not None:
+            playlist, version, songs = cached
+        elif (playlist := await liked_playlist(user=user)) is not None:
+            version, songs = (-1, None), []
+        else:
+            return []
+
+        if (current := await liked_version(playlist)) == version:
+            return songs
+
+        songs = []
+        after: Cursor | None = None
+        while rows := await liked_page(playlist, limit=PAGE_SIZE, after=after):
+            tracks = await self.bot.decoder.decode([row["lavalink_id"] for row in rows])
+            songs.extend(
+                (row["song"], _name(track))
+                for row, track in zip(rows, tracks, strict=True)
+            )
+            if len(rows) < PAGE_SIZE:
+                break
+
+            after = rows[-1]["added"], rows[-1]["id"]
+
+        self._users[user] = playlist, current, songs
+        return songs
@@ -1,13 +1,12 @@
 from __future__ import annotations
 
-from base64 import b64encode
 from math import ceil
 from time import gmtime, strftime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from nextcord.ext.menus import ButtonMenuPages, PageSource
 
-from vibr.db import Playlist, PlaylistToSong
+from vibr.database import END, liked_page
 from vibr.embed import Embed
 from vibr.utils import truncate
 
@@ -15,6 +14,8 @@ if TYPE_CHECKING:
     from mafic import Track
 
     from vibr.bot import Vibr
+    from vibr.database import Cursor
+    from vibr.db import Playlist
 
 
 FORMAT = "**{index}.** [**{title}**]({uri}) by **{author}** [{length}]"
@@ -33,6 +34,10 @@ class LikedSource(PageSource):
         self.per_page = per_page
         self.count = count
         self.bot = bot
+        # The songs either side of each page seen, so the pages next to it can
+        # be found without counting past the songs before them.
+        self._after: dict[int, Cursor | None] = {0: None}
+        self._before: dict[int, Cursor] = {}
 
     def is_paginating(self) -> bool:
         return self.count > self.per_page
@@ -40,20 +45,45 @@ class LikedSource(PageSource):
     def get_max_pages(self) -> int | None:
         return ceil(self.count / self.per_page)
 
+    async def _rows(self, page_number: int) -> list[dict[str, Any]]:
+        last = ceil(self.count / self.per_page) - 1
+        if page_number in self._after:
+            return await liked_page(
+                self.playlist.id,
+                limit=self.per_page,
+                after=self._after[page_number],
+            )
+
+        if page_number == last:
+            # The last page may not be full.
+            return await liked_page(
+                self.playlist.id,
+                limit=self.count - page_number * self.per_page,
+                before=END,
+            )
+
+        if (before := self._before.get(page_number)) is not None:
+            return await liked_page(
+                self.playlist.id, limit=self.per_page, before=before
+            )
+
+        # Not next to a page seen yet, the menu only goes to the first, last
+        # and neighbouring pages so this is not expected.
+        self._remember(page_number - 1, await self._rows(page_number - 1))
+        return await self._rows(page_number)
+
+    def _remember(self, page_number: int, rows: list[dict[str, Any]]) -> None:
+        if rows:
+            self._after[page_number + 1] = (rows[-1]["added"], rows[-1]["id"])
+            self._before[page_number - 1] = (rows[0]["added"], rows[0]["id"])
+
     async def get_page(self, page_number: int) -> list[tuple[Track, int]]:
-        songs = (
-            await PlaylistToSong.select(PlaylistToSong.song.lavalink_id)
-            .where(PlaylistToSong.playlist == self.playlist.id)
-            .offset(page_number * self.per_page)
-            .limit(self.per_page)
-            .order_by(PlaylistToSong.added)
-        )
-        node = self.bot.pool.label_to_node["LOCAL"]
+        rows = await self._rows(page_number)
+        self._remember(page_number, rows)
+        tracks = await self.bot.decoder.decode([row["lavalink_id"] for row in rows])
         return list(
             zip(
-                await node.decode_tracks(
-                    [b64encode(song["song.lavalink_id"]).decode() for song in songs]
-                ),
+                tracks,
                 range(
                     page_number * self.per_page,
                     page_number * self.per_page + self.per_page,
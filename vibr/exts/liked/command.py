@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from base64 import b64encode
+from itertools import islice
 from logging import getLogger
+from typing import TYPE_CHECKING
 
 import mafic
 from botbase import CogBase
@@ -10,21 +11,33 @@ from nextcord import SlashOption, slash_command
 
 from vibr.bot import Vibr
 from vibr.checks import is_connected
-from vibr.database import add_to_liked, remove_from_liked
+from vibr.database import MAX_LIKED, add_to_liked, remove_from_liked
 from vibr.db import Playlist, PlaylistToSong
-from vibr.db.playlists import Song
 from vibr.embed import Embed
 from vibr.errors import NoTracksFound
 from vibr.inter import Inter
 from vibr.views import SearchView
 
 from ._errors import *
+from ._songs import LikedTitles
 from ._views import LikedMenu, LikedSource
 
+if TYPE_CHECKING:
+    from vibr.db.playlists import Song
+
 log = getLogger(__name__)
 
+AUTOCOMPLETE_MAX = 25
+# Marks an autocompleted song ID, so it is not taken for an index.
+SONG_PREFIX = "song:"
+
 
 class Liked(CogBase[Vibr]):
+    def __init__(self, bot: Vibr) -> None:
+        super().__init__(bot)
+
+        self.titles = LikedTitles(bot)
+
     @slash_command(dm_permission=False)
     async def liked(self, inter: Inter) -> None:
         ...
@@ -39,7 +52,7 @@ class Liked(CogBase[Vibr]):
             "Apple Music": SearchType.APPLE_MUSIC.value,
             "Deezer": SearchType.DEEZER_SEARCH.value,
         },
-        default=SearchType.APPLE_MUSIC .value,
+        default=SearchType.APPLE_MUSIC.value,
     )
 
     @liked.subcommand(name="add")
@@ -63,9 +76,8 @@ class Liked(CogBase[Vibr]):
         track = inter.guild.voice_client and inter.guild.voice_client.current
 
         if query:
-            node = self.bot.pool.label_to_node["LOCAL"]
-            result = await node.fetch_tracks(
-                query, search_type=search_type or "youtube"
+            result = await self.bot.tracks.fetch_tracks(
+                None, query, search_type=search_type or "youtube"
             )
 
             if not result:
@@ -107,31 +119,78 @@ class Liked(CogBase[Vibr]):
             view=None,
         )
 
+    INDEX = SlashOption(min_value=1, max_value=MAX_LIKED, required=False)
+
     @liked.subcommand(name="remove")
-    async def liked_remove(self, inter: Inter, index: int) -> None:
+    async def liked_remove(
+        self,
+        inter: Inter,
+        index: int | None = INDEX,
+        song: str | None = None,
+    ) -> None:
         """Remove a song from your liked songs playlist.
 
         index:
             The index of the song to remove.
             This can be found by using the `/liked list` command.
+        song:
+            The song to remove, found by name instead of its index.
         """
 
         await inter.response.defer(ephemeral=True)
 
-        index -= 1
-        lavalink_id = await remove_from_liked(user=inter.author, index=index)
-        log.info("Removed %d from %d's liked songs playlist", index, inter.author.id)
+        if song is not None:
+            if song.startswith(SONG_PREFIX) and song[len(SONG_PREFIX) :].isdigit():
+                song_id = int(song[len(SONG_PREFIX) :])
+            else:
+                # Typed without picking a suggestion, only taken if it is clear.
+                query = song.lower()
+                songs = await self.titles.get(inter.author.id)
+                matches = [i for i, name in songs if query in name.lower()]
+                if len(matches) != 1:
+                    raise NoSongNamed(self.bot)
+
+                (song_id,) = matches
+        elif index is not None:
+            songs = await self.titles.get(inter.author.id)
+            if index > len(songs):
+                raise NoSongAtIndex(self.bot)
+
+            song_id, _ = songs[index - 1]
+        else:
+            raise NoSongNamed(self.bot)
+
+        lavalink_id = await remove_from_liked(user=inter.author, song=song_id)
+        log.info("Removed %d from %d's liked songs playlist", song_id, inter.author.id)
 
         if lavalink_id is None:
             raise NoSongAtIndex(self.bot)
 
-        node = self.bot.pool.label_to_node["LOCAL"]
-        track = await node.decode_track(lavalink_id)
+        (track,) = await self.bot.decoder.decode([lavalink_id])
         await inter.send(
             f"Removed **{track.title}** from your liked songs playlist.",
             ephemeral=True,
         )
 
+    @liked_remove.on_autocomplete("song")
+    async def liked_remove_autocomplete(
+        self, inter: Inter, song: str
+    ) -> dict[str, str]:
+        query = song.lower()
+        # The song's ID is sent back, it stays the same when others are removed.
+        return dict(
+            islice(
+                (
+                    (f"{index}: {name}", f"{SONG_PREFIX}{song_id}")
+                    for index, (song_id, name) in enumerate(
+                        await self.titles.get(inter.user.id), start=1
+                    )
+                    if query in name.lower()
+                ),
+                AUTOCOMPLETE_MAX,
+            )
+        )
+
     @liked.subcommand(name="list")
     async def liked_list(self, inter: Inter) -> None:
         """List your liked songs playlist."""
@@ -169,11 +228,9 @@ class Liked(CogBase[Vibr]):
         if not songs:
             raise NoLikedSongs(self.bot)
 
-        tracks = await inter.guild.voice_client.node.decode_tracks(
-            [b64encode(song.lavalink_id).decode() for song in songs]
-        )
+        tracks = await self.bot.decoder.decode([song.lavalink_id for song in songs])
         if player.current is None:
-            await player.play(tracks[0])
+            await player.play(tracks[0], requester=inter.user.id)
             tracks = tracks[1:]
 
         player.queue.extend([(track, inter.user.id) for track in tracks])
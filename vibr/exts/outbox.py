@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from botbase import CogBase
+
+from vibr.bot import Vibr
+from vibr.inter import Inter
+from vibr.outbox import outbox
+
+
+class Outbox(CogBase[Vibr]):
+    @CogBase.listener()
+    async def on_interaction(self, _: Inter) -> None:
+        # Responding to it comes before the notifications queued in the outbox.
+        outbox.interaction()
+
+
+def setup(bot: Vibr) -> None:
+    bot.add_cog(Outbox(bot))
@@ -1,7 +1,13 @@
 from vibr.embed import ErrorEmbed
 from vibr.errors import CheckFailure
 
-__all__ = ("AlreadyPaused", "AlreadyResumed", "NotInRange", "InvalidFormat")
+__all__ = (
+    "AlreadyPaused",
+    "AlreadyResumed",
+    "NotInRange",
+    "InvalidFormat",
+    "NoPreviousTrack",
+)
 
 
 class AlreadyPaused(CheckFailure):
@@ -28,3 +34,10 @@ class InvalidFormat(CheckFailure):
     embed = ErrorEmbed(
         title="Invalid Format", description="Please use HH:MM:SS or MM:SS format"
     )
+
+
+class NoPreviousTrack(CheckFailure):
+    embed = ErrorEmbed(
+        title="No Previous Track",
+        description="Nothing has been played before this track.",
+    )
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from botbase import CogBase
+from nextcord import InteractionType
+
+from vibr.bot import Vibr
+from vibr.buttons import PREFIX, press
+from vibr.inter import Inter
+
+
+class PlayerButtons(CogBase[Vibr]):
+    @CogBase.listener()
+    async def on_interaction(self, inter: Inter) -> None:
+        # The buttons have no view to dispatch to, every message's are handled here.
+        if inter.type is not InteractionType.component or inter.data is None:
+            return
+
+        custom_id = inter.data.get("custom_id", "")
+        if custom_id.startswith(PREFIX):
+            await press(inter, custom_id)
+
+
+def setup(bot: Vibr) -> None:
+    bot.add_cog(PlayerButtons(bot))
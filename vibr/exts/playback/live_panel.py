@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from botbase import CogBase
+from nextcord import slash_command
+
+from vibr.bot import Vibr
+from vibr.checks import is_connected
+from vibr.embed import Embed
+from vibr.inter import Inter
+from vibr.live_panel import LivePanel
+
+
+class LivePanelCommand(CogBase[Vibr]):
+    @slash_command(dm_permission=False, name="live-panel")
+    @is_connected
+    async def live_panel(self, inter: Inter) -> None:
+        """Show one message that updates with each song, instead of one per song."""
+
+        player = inter.guild.voice_client
+        if player.panel is None:
+            player.panel = LivePanel(
+                player, inter.channel  # pyright: ignore[reportGeneralTypeIssues]
+            )
+            embed = Embed(
+                title="Live panel ON",
+                description="Now the bot will keep one message updated "
+                "with the current song and what plays next",
+            )
+        else:
+            player.panel.stop()
+            player.panel = None
+            embed = Embed(
+                title="Live panel OFF",
+                description="Now the bot will send an embed at the start of every song",
+            )
+
+        await inter.send(embed=embed)
+
+
+def setup(bot: Vibr) -> None:
+    bot.add_cog(LivePanelCommand(bot))
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from botbase import CogBase
+from nextcord import slash_command
+
+from vibr.bot import Vibr
+from vibr.checks import is_connected_and_playing
+from vibr.inter import Inter
+from vibr.track_embed import track_embed
+
+from ._errors import NoPreviousTrack
+
+
+class Previous(CogBase[Vibr]):
+    @slash_command(dm_permission=False)
+    @is_connected_and_playing
+    async def previous(self, inter: Inter) -> None:
+        """Go back to the previous track, the current one will play next."""
+
+        player = inter.guild.voice_client
+
+        try:
+            track, user = player.queue.previous()
+        except IndexError as e:
+            raise NoPreviousTrack from e
+
+        await player.play(track, requester=user)
+        embed, view = await track_embed(track, user=user)
+        await inter.send(embed=embed, view=view)
+
+
+def setup(bot: Vibr) -> None:
+    bot.add_cog(Previous(bot))
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from botbase import CogBase
+from nextcord import Range, slash_command
+
+from vibr.bot import Vibr
+from vibr.checks import is_connected
+from vibr.embed import Embed
+from vibr.inter import Inter
+
+from ._errors import NoPreviousTrack
+
+
+class Replay(CogBase[Vibr]):
+    @slash_command(dm_permission=False)
+    @is_connected
+    async def replay(
+        self,
+        inter: Inter,
+        amount: Range[1, 100] = 1,  # pyright: ignore[reportGeneralTypeIssues]
+    ) -> None:
+        """Play the last tracks again, after the current one.
+
+        amount:
+            How many of the last tracks to play again.
+        """
+
+        player = inter.guild.voice_client
+        playing = player.current is not None
+
+        # The current track is the last one in the history.
+        items = player.queue.history.last(amount + playing)
+        if playing:
+            items = items[:-1]
+        if not items:
+            raise NoPreviousTrack
+
+        player.queue.insert_many(0, items)
+        embed = Embed(
+            title="Replaying Tracks",
+            description=f"Queued the last {len(items)} tracks to play next.",
+        )
+        await inter.send(embed=embed)
+
+
+def setup(bot: Vibr) -> None:
+    bot.add_cog(Replay(bot))
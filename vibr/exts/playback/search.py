@@ -40,8 +40,9 @@ class Search(CogBase[Vibr]):
 
         await inter.response.defer(ephemeral=True)
 
-        node = self.bot.pool.label_to_node["LOCAL"]
-        result = await node.fetch_tracks(song, search_type=search_type or "youtube")
+        result = await self.bot.tracks.fetch_tracks(
+            None, song, search_type=search_type or "youtube"
+        )
 
         if not result:
             raise NoTracksFound
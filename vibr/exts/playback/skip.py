@@ -47,6 +47,7 @@ class Skip(CogBase[Vibr]):
         else:
             amount_int = 1
 
+        player.queue.refill()
         if not player.queue:
             await player.stop()
             embed = ErrorEmbed(title="Queue Empty",
@@ -57,10 +58,9 @@ class Skip(CogBase[Vibr]):
             raise IndexNotInQueue
 
         track, user = player.queue.skip(amount_int)
-        await player.play(track)
+        await player.play(track, requester=user)
         embed, view = await track_embed(track, user=user, skipped=inter.user.id)
-        m = await inter.response.send_message(embed=embed, view=view)
-        view.message = m
+        await inter.response.send_message(embed=embed, view=view)
 
     @skip.on_autocomplete("amount")
     async def skip_autocomplete(self, inter: Inter, amount: str) -> dict[str, str]:
@@ -80,9 +80,8 @@ class Skip(CogBase[Vibr]):
             return {f"{i}: {get_str(track)}": i for i, track in tracks}
 
         if not amount:
-            tracks = list(enumerate(player.queue.tracks))
-            if len(tracks) > AUTOCOMPLETE_MAX:
-                tracks = tracks[:AUTOCOMPLETE_MAX]
+            count = min(len(player.queue), AUTOCOMPLETE_MAX)
+            tracks = [(i, player.queue[i]) for i in range(count)]
 
             return {f"{i+1}: {get_str(track)}": str(i + 1) for i, track in tracks}
 
@@ -1,11 +1,22 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from botbase import CogBase
 from mafic import SearchType
 from nextcord import SlashOption, slash_command
 
 from vibr.bot import Vibr
 from vibr.inter import Inter
+from vibr.utils import truncate
+
+if TYPE_CHECKING:
+    from mafic import TrackStartEvent
+
+    from vibr.player import Player
+
+# Discord limits choice names and values to 100 characters.
+MAX_CHOICE_LENGTH = 100
 
 
 class Play(CogBase[Vibr]):
@@ -47,6 +58,32 @@ class Play(CogBase[Vibr]):
             inter=inter, query=query, search_type=search_type, type=type
         )
 
+    @play.on_autocomplete("query")
+    async def play_autocomplete(self, inter: Inter, query: str) -> dict[str, str]:
+        tracks = await self.bot.play_index.search(inter.user.id, query)
+        return {
+            truncate(f"{title} by {author}", length=MAX_CHOICE_LENGTH): uri
+            for title, author, uri in tracks
+            if len(uri) <= MAX_CHOICE_LENGTH
+        }
+
+    @CogBase.listener()
+    async def on_ready(self) -> None:
+        if not self.bot.play_index.loaded:
+            await self.bot.play_index.load()
+
+    @CogBase.listener()
+    async def on_track_start(self, event: TrackStartEvent[Player]) -> None:
+        player = event.player
+        track = event.track
+        if not player.queue.history or track.uri is None:
+            return
+
+        # The requester of the current track, the last one in the history.
+        ((_, user),) = player.queue.history.last(1)
+        if user:
+            self.bot.play_index.add(user, track.title, track.author, track.uri)
+
 
 def setup(bot: Vibr) -> None:
     bot.add_cog(Play(bot))
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
+from math import ceil
 from time import gmtime, strftime
 from typing import TYPE_CHECKING, cast
 
 from nextcord import ButtonStyle
 from nextcord.abc import Snowflake
-from nextcord.ext.menus import ButtonMenuPages, ListPageSource
+from nextcord.ext.menus import ButtonMenuPages, PageSource
 from nextcord.ui import Button, Select
 
 from vibr.embed import Embed
+from vibr.outbox import Priority, outbox
 from vibr.patches.nextcord.ui import button
 
 if TYPE_CHECKING:
@@ -16,6 +18,7 @@ if TYPE_CHECKING:
     from nextcord import PartialInteractionMessage
 
     from vibr.inter import Inter
+    from vibr.player import Player
 
 
 class QueueMenu(ButtonMenuPages):
@@ -33,7 +36,11 @@ class QueueMenu(ButtonMenuPages):
             if isinstance(child, Button | Select):
                 child.disabled = True
 
-        await self.message.edit(view=self)
+        await outbox.run(
+            self.interaction.channel_id,
+            lambda: self.message.edit(view=self),
+            priority=Priority.EDIT,
+        )
 
     async def interaction_check(self, inter: Inter) -> bool:
         # user is an owner, or was the user that started the interaction.
@@ -83,19 +90,48 @@ class QueueMenu(ButtonMenuPages):
         player.queue.shuffle()
         embed = Embed(title="Shuffled the queue")
         await inter.send(embed=embed)
-        await self.change_source(QueueSource([player.current, *player.queue]))
+        await self.change_source(QueueSource(player))
+
+
+class QueueSource(PageSource):
+    def __init__(self, player: Player, *, per_page: int = 10) -> None:
+        self.player = player
+        self.per_page = per_page
+
+    @property
+    def count(self) -> int:
+        return len(self.player.queue) + (self.player.current is not None)
+
+    def is_paginating(self) -> bool:
+        return self.count > self.per_page
+
+    def get_max_pages(self) -> int:
+        return max(ceil(self.count / self.per_page), 1)
+
+    async def get_page(self, page_number: int) -> list[Track]:
+        # Pages index [current, *queue], without building that list.
+        start = page_number * self.per_page
+        stop = start + self.per_page
+        current = self.player.current
+
+        if current is None:
+            return self.player.queue.page(start, stop)
 
+        if page_number == 0:
+            return [current, *self.player.queue.page(0, stop - 1)]
 
-class QueueSource(ListPageSource):
-    def __init__(self, tracks: list[Track]) -> None:
-        super().__init__(entries=tracks, per_page=10)
-        self.queue = tracks
-        self.title = f"Queue of {len(tracks)} songs"
+        return self.player.queue.page(start - 1, stop - 1)
 
     def format_page(self, menu: QueueMenu, tracks: list[Track]) -> Embed:
-        add = self.queue.index(tracks[0]) + 1
+        current = self.player.current
+        page = menu.current_page
+        # Queue position of the first track on this page, as used by `/remove`.
+        add = page * self.per_page + (current is None or page == 0)
 
-        current = tracks.pop(0) if tracks[0] == self.queue[0] else None
+        if page == 0 and current is not None:
+            tracks = tracks[1:]
+        else:
+            current = None
 
         tracks_desc = "\n".join(
             # 1. title by author [length]
@@ -117,14 +153,14 @@ class QueueSource(ListPageSource):
         embed = Embed(description=tracks_desc)
 
         maximum = self.get_max_pages()
-        # if maximum > 1:
-        c = sum((t.length / 1000 if t.length else 0) for t in self.queue)
-        a = strftime("%H:%M:%S", gmtime(round(c)))
+        c = self.player.queue.length
+        if self.player.current is not None:
+            c += self.player.current.length or 0
+        a = strftime("%H:%M:%S", gmtime(round(c / 1000)))
         embed.set_footer(
-            text=f"Page {menu.current_page + 1}/{maximum} "
-            f"({len(self.queue)} tracks - total {a})"
+            text=f"Page {page + 1}/{maximum} ({self.count} tracks - total {a})"
         )
 
-        embed.set_author(name=self.title)
+        embed.set_author(name=f"Queue of {self.count} songs")
 
         return embed
@@ -63,7 +63,7 @@ class QueueCommand(CogBase[Vibr]):
         if not queue and not current:
             raise EmptyQueue
 
-        menu = QueueMenu(source=QueueSource([current, *queue]), inter=inter)
+        menu = QueueMenu(source=QueueSource(player), inter=inter)
         await menu.start(interaction=inter)
 
     @queue.subcommand(name="shuffle")
@@ -77,6 +77,56 @@ class QueueCommand(CogBase[Vibr]):
         embed = Embed(title="Shuffled the queue")
         await inter.send(embed=embed)
 
+    @queue.subcommand(name="unshuffle")
+    @is_connected_and_playing
+    async def queue_unshuffle(self, inter: Inter) -> None:
+        """Put the queue back in the order it was before shuffling."""
+
+        player = inter.guild.voice_client
+
+        if player.queue.unshuffle():
+            embed = Embed(title="Unshuffled the queue")
+        else:
+            embed = Embed(
+                title="Not Shuffled", description="The queue has not been shuffled."
+            )
+
+        await inter.send(embed=embed)
+
+    @queue.subcommand(name="shuffle-on-play")
+    @is_connected_and_playing
+    async def queue_shuffle_on_play(self, inter: Inter) -> None:
+        """Toggle playing a random track next, without reordering the queue."""
+
+        player = inter.guild.voice_client
+
+        player.queue.shuffle_on_play = not player.queue.shuffle_on_play
+        if player.queue.shuffle_on_play:
+            embed = Embed(title="Shuffle on Play Enabled")
+        else:
+            embed = Embed(title="Shuffle on Play Disabled")
+
+        await inter.send(embed=embed)
+
+    @queue.subcommand(name="fair-share")
+    @is_connected_and_playing
+    async def queue_fair_share(self, inter: Inter) -> None:
+        """Toggle taking turns between everyone who queued songs."""
+
+        player = inter.guild.voice_client
+
+        if player.queue.fair_share:
+            player.queue.disable_fair_share()
+            embed = Embed(title="Fair Share Disabled")
+        else:
+            player.queue.enable_fair_share()
+            embed = Embed(
+                title="Fair Share Enabled",
+                description="Songs will play in turns by whoever queued them.",
+            )
+
+        await inter.send(embed=embed)
+
 
 def setup(bot: Vibr) -> None:
     bot.add_cog(QueueCommand(bot))
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
 from logging import getLogger
+from time import perf_counter
 from typing import TYPE_CHECKING
 
 from botbase import CogBase
 from mafic import EndReason, TrackEndEvent, TrackStartEvent
 from nextcord import HTTPException
+from prometheus_client import Histogram
 
 from vibr.bot import Vibr
 from vibr.embed import Embed
+from vibr.outbox import Priority, outbox
 from vibr.track_embed import track_embed
 
 if TYPE_CHECKING:
@@ -18,21 +21,43 @@ log = getLogger(__name__)
 
 
 class Queue(CogBase[Vibr]):
+    def __init__(self, bot: Vibr) -> None:
+        super().__init__(bot)
+
+        self.transition_gap = Histogram(
+            "vibr_track_transition_seconds",
+            "Time between a track ending and the next one starting",
+            labelnames=["node"],
+            buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10),
+        )
+        # When the last track ended per guild, for tracks played from the queue.
+        self._ended: dict[int, float] = {}
+
     @CogBase.listener()
     async def on_track_end(self, event: TrackEndEvent[Player]) -> None:
         player = event.player
 
         if event.reason in (EndReason.FINISHED, EndReason.LOAD_FAILED):
+            self._ended[player.guild.id] = perf_counter()
             try:
                 play_next, member = player.queue.take()
             except IndexError:
-                if channel := player.notification_channel:
+                self._ended.pop(player.guild.id, None)
+                if player.panel is not None:
+                    player.panel.refresh()
+                elif channel := player.notification_channel:
                     embed = Embed(title="End of Queue")
-                    await channel.send(embed=embed)
+                    await outbox.run(
+                        channel.id,
+                        lambda: channel.send(embed=embed),
+                        priority=Priority.PLAYER,
+                        key="player",
+                    )
                 player.start_disconnect_timer()
             else:
-                await player.play(play_next)
-                if player.dnd:
+                await player.play(play_next, requester=member)
+                # The live panel is refreshed when the track starts.
+                if player.dnd or player.panel is not None:
                     return
 
                 if channel := player.notification_channel:
@@ -42,19 +67,31 @@ class Queue(CogBase[Vibr]):
                         looping=player.queue.loop_type is not None,
                     )
                     try:
-                        m = await channel.send(embed=embed, view=view)
+                        # Replaced by the next track's if still waiting to be sent.
+                        await outbox.run(
+                            channel.id,
+                            lambda: channel.send(embed=embed, view=view),
+                            priority=Priority.PLAYER,
+                            key="player",
+                        )
                     except HTTPException:
                         log.warning("Failed to send track embed to channel %s", channel)
                         player.notification_channel = None
-                    else:
-                        view.message = m
 
     @CogBase.listener()
     async def on_track_start(self, event: TrackStartEvent[Player]) -> None:
         player = event.player
 
-        if player.loop_queue_check and player.current is not None:
-            player.loop_queue = [player.current]
+        if (ended := self._ended.pop(player.guild.id, None)) is not None:
+            self.transition_gap.labels(player.node.label).observe(
+                perf_counter() - ended
+            )
+
+        # Load the next tracks while this one plays, so the switch at the end is
+        # just the play call.
+        player.resolver.schedule()
+        if player.panel is not None:
+            player.panel.refresh()
 
 
 def setup(bot: Vibr) -> None:
@@ -49,7 +49,7 @@ class LoopCommand(CogBase[Vibr]):
         assert player.current is not None
 
         if not player.queue._loop_type_queue:
-            player.queue.loop_queue(current=player.current, user=inter.user.id)
+            player.queue.loop_queue()
             embed = Embed(title="Looping Queue")
         else:
             player.queue.disable_loop_queue()
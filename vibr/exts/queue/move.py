@@ -60,14 +60,12 @@ class Move(CogBase[Vibr]):
 
         track_index = int(track)
         try:
-            track_n = player.queue[track_index - 1]
-            player.queue.pop(track_index - 1)
+            track_n = player.queue.move(track_index - 1, destination - 1)
         except IndexError:
             await inter.send(
                 "Please input a number which is within your queue!", ephemeral=True
             )
             return
-        player.queue.insert(destination - 1, track_n, user=inter.user.id)
 
         embed = Embed(title=f'"{track_n.title}" position set to {destination}')
         await inter.send(embed=embed)
@@ -90,9 +88,8 @@ class Move(CogBase[Vibr]):
             return {f"{i}: {get_str(track)}": i for i, track in tracks}
 
         if not amount:
-            tracks = list(enumerate(player.queue.tracks))
-            if len(tracks) > AUTOCOMPLETE_MAX:
-                tracks = tracks[:AUTOCOMPLETE_MAX]
+            count = min(len(player.queue), AUTOCOMPLETE_MAX)
+            tracks = [(i, player.queue[i]) for i in range(count)]
 
             return {f"{i+1}: {get_str(track)}": str(i + 1) for i, track in tracks}
 
@@ -21,8 +21,7 @@ class Nowplaying(CogBase[Vibr]):
         embed, view = await track_embed(
             player.current, user=inter.user.id, inter=inter, length_embed=True
         )
-        m = await inter.send(embed=embed, view=view)
-        view.message = m
+        await inter.send(embed=embed, view=view)
 
 
 def setup(bot: Vibr) -> None:
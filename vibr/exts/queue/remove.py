@@ -84,9 +84,8 @@ class Remove(CogBase[Vibr]):
             return {f"{i}: {get_str(track)}": i for i, track in tracks}
 
         if not amount:
-            tracks = list(enumerate(player.queue.tracks))
-            if len(tracks) > AUTOCOMPLETE_MAX:
-                tracks = tracks[:AUTOCOMPLETE_MAX]
+            count = min(len(player.queue), AUTOCOMPLETE_MAX)
+            tracks = [(i, player.queue[i]) for i in range(count)]
 
             return {f"{i+1}: {get_str(track)}": str(i + 1) for i, track in tracks}
 
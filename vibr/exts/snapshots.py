@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from logging import getLogger
+
+from botbase import CogBase
+from nextcord.ext.tasks import loop
+
+from vibr.bot import Vibr
+
+log = getLogger(__name__)
+FLUSH_INTERVAL = 5
+
+
+class Snapshots(CogBase[Vibr]):
+    def __init__(self, bot: Vibr) -> None:
+        super().__init__(bot)
+        self.flush.start()
+
+    @loop(seconds=FLUSH_INTERVAL)
+    async def flush(self) -> None:
+        try:
+            await self.bot.snapshots.flush()
+        except Exception:
+            log.warning("Failed to flush player snapshots", exc_info=True)
+
+    @flush.before_loop
+    async def before_flush(self) -> None:
+        # Restore before the first flush, so it cannot overwrite saved players.
+        await self.bot.wait_until_ready()
+        await self.bot.nodes_connected.wait()
+        await self.bot.snapshots.restore()
+
+    def cog_unload(self) -> None:
+        self.flush.cancel()
+
+
+def setup(bot: Vibr) -> None:
+    bot.add_cog(Snapshots(bot))
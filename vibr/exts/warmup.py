@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from asyncio import sleep
+from logging import getLogger
+from os import getenv
+from time import perf_counter
+
+from botbase import CogBase
+from mafic import SearchType
+
+from vibr.bot import Vibr
+from vibr.db import SongLog
+
+log = getLogger(__name__)
+
+WARMUP_DELAY = int(getenv("WARMUP_DELAY", "60"))
+WARMUP_SIZE = int(getenv("WARMUP_SIZE", "500"))
+WARMUP_DAYS = int(getenv("WARMUP_DAYS", "7"))
+
+
+class Warmup(CogBase[Vibr]):
+    def __init__(self, bot: Vibr) -> None:
+        super().__init__(bot)
+        self.task = bot.loop.create_task(self.warm())
+
+    async def warm(self) -> None:
+        await self.bot.wait_until_ready()
+        await self.bot.nodes_connected.wait()
+        # Players reconnect and restore first, they are what users notice.
+        await sleep(WARMUP_DELAY)
+
+        rows = await SongLog.raw(
+            """SELECT uri
+            FROM song_log
+            WHERE uri IS NOT NULL AND last_played > now() - make_interval(days => {})
+            GROUP BY uri
+            ORDER BY sum(amount) DESC
+            LIMIT {}
+            """,
+            WARMUP_DAYS,
+            WARMUP_SIZE,
+        )
+
+        start = perf_counter()
+        await self.bot.tracks.warm(
+            [row["uri"] for row in rows], search_type=SearchType.YOUTUBE.value
+        )
+        log.info(
+            "Warmed the track cache with %d tracks in %.1fs",
+            len(rows),
+            perf_counter() - start,
+        )
+
+    def cog_unload(self) -> None:
+        self.task.cancel()
+
+
+def setup(bot: Vibr) -> None:
+    bot.add_cog(Warmup(bot))
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from logging import getLogger
+
+from botbase import CogBase
+from nextcord.ext.tasks import loop
+
+from vibr.bot import Vibr
+from vibr.inter import Inter
+from vibr.write_behind import command_log, song_log
+
+log = getLogger(__name__)
+FLUSH_INTERVAL = 5
+
+
+class WriteBehind(CogBase[Vibr]):
+    def __init__(self, bot: Vibr) -> None:
+        super().__init__(bot)
+        self.flush.start()
+
+    @CogBase.listener()
+    async def on_application_command_completion(self, inter: Inter) -> None:
+        assert inter.application_command is not None
+
+        guild = inter.guild.id if inter.guild is not None else None
+        channel = inter.channel.id if inter.guild is not None else None
+        command_log.add((inter.application_command.name, guild, channel, inter.user.id))
+
+    @loop(seconds=FLUSH_INTERVAL)
+    async def flush(self) -> None:
+        for buffer in (song_log, command_log):
+            try:
+                await buffer.flush()
+            except Exception:
+                log.warning("Failed to flush %s", buffer.name, exc_info=True)
+
+    def cog_unload(self) -> None:
+        self.flush.cancel()
+
+
+def setup(bot: Vibr) -> None:
+    bot.add_cog(WriteBehind(bot))
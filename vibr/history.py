@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from base64 import b64decode
+from collections import deque
+from itertools import islice
+from typing import TYPE_CHECKING
+
+from vibr.track_store import TrackStore
+
+if TYPE_CHECKING:
+    from mafic import Track
+
+__all__ = ("History",)
+
+
+class History:
+    """The most recently played tracks, dropping the oldest once full.
+
+    Tracks are kept in a :class:`TrackStore`, so a full history costs the
+    same as a queue of the same length, and slots of dropped tracks are reused.
+
+    Parameters
+    ----------
+    maxlen:
+        The most tracks to keep.
+    """
+
+    __slots__ = ("_store", "_slots", "_maxlen", "_pushed")
+
+    def __init__(self, maxlen: int) -> None:
+        self._store = TrackStore()
+        self._slots: deque[int] = deque()
+        self._maxlen = maxlen
+        self._pushed = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def pushed(self) -> int:
+        """How many tracks have ever been pushed, including dropped ones."""
+
+        return self._pushed
+
+    def _item(self, slot: int) -> tuple[Track, int]:
+        return self._store.track(slot), self._store.requester(slot)
+
+    def _same(self, slot: int, track: Track) -> bool:
+        if track.id:
+            return self._store.encoded(slot) == b64decode(track.id)
+
+        return not self._store.encoded(slot) and self._store.uri(slot) == track.uri
+
+    def push(self, track: Track, requester: int, *, repeat: bool = False) -> None:
+        """Add a track that started playing.
+
+        Parameters
+        ----------
+        track:
+            The track.
+        requester:
+            The ID of the user who queued it.
+        repeat:
+            Whether the track is played again by looping it, in which case it is
+            only kept once. Tracks queued more than once are kept every time.
+        """
+
+        if repeat and self._slots and self._same(self._slots[-1], track):
+            return
+
+        if len(self._slots) >= self._maxlen:
+            self._store.remove(self._slots.popleft())
+
+        self._slots.append(self._store.add(track, requester))
+        self._pushed += 1
+
+    def pop(self) -> tuple[Track, int]:
+        """Remove and return the most recent track."""
+
+        slot = self._slots.pop()
+        item = self._item(slot)
+        self._store.remove(slot)
+        self._pushed -= 1
+        return item
+
+    def last(self, amount: int) -> list[tuple[Track, int]]:
+        """The last ``amount`` tracks, oldest first."""
+
+        slots = list(islice(reversed(self._slots), max(amount, 0)))
+        return [self._item(slot) for slot in reversed(slots)]
+
+    def find(self, key: str) -> Track | None:
+        """The most recent track with the :func:`~vibr.track_store.track_key`
+        ``key``, if it is still kept."""
+
+        for slot in reversed(self._slots):
+            if self._store.key(slot) == key:
+                return self._store.track(slot)
+
+        return None
+
+    def since(self, pushed: int) -> list[tuple[Track, int]]:
+        """The tracks pushed after :attr:`pushed` was ``pushed``, oldest first.
+
+        Tracks that have already been dropped are not included.
+        """
+
+        return self.last(self._pushed - pushed)
+
+    def clear(self) -> None:
+        self._store.clear()
+        self._slots.clear()
+        self._pushed = 0
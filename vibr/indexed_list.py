@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+from itertools import chain, islice
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+__all__ = ("IndexedList",)
+
+T = TypeVar("T")
+LOAD = 256
+
+
+def _fenwick(values: Iterable[int]) -> list[int]:
+    # Fenwick tree is 1-indexed, built in O(n).
+    tree = [0, *values]
+    size = len(tree)
+    for i in range(1, size):
+        parent = i + (i & -i)
+        if parent < size:
+            tree[parent] += tree[i]
+
+    return tree
+
+
+def _add(tree: list[int], index: int, delta: int) -> None:
+    i = index + 1
+    size = len(tree)
+    while i < size:
+        tree[i] += delta
+        i += i & -i
+
+
+def _prefix(tree: list[int], index: int) -> int:
+    total = 0
+    while index:
+        total += tree[index]
+        index -= index & -index
+
+    return total
+
+
+class IndexedList(Generic[T]):
+    """A list with O(log n) positional access, insertion and deletion.
+
+    Items are kept in blocks of at most ``LOAD * 2`` items, with a Fenwick tree
+    over the block lengths to find which block holds an index. Positional
+    operations touch one block and ``log(blocks)`` tree nodes, instead of
+    shifting every item after the index like a :class:`list` or walking from
+    the nearest end like a :class:`collections.deque`.
+
+    Parameters
+    ----------
+    items:
+        The initial items.
+    weight:
+        If given, a second tree over per-block sums of ``weight(item)`` is kept
+        up to date, for :attr:`total` and :meth:`prefix`.
+    """
+
+    __slots__ = ("_blocks", "_tree", "_len", "_weight", "_sums", "_wtree", "_total")
+
+    def __init__(
+        self, items: Iterable[T] = (), *, weight: Callable[[T], int] | None = None
+    ) -> None:
+        self._blocks: list[list[T]] = []
+        self._tree: list[int] = [0]
+        self._len = 0
+        self._weight = weight
+        self._sums: list[int] = []
+        self._wtree: list[int] = [0]
+        self._total = 0
+        self.extend(items)
+
+    def _sum(self, items: Iterable[T]) -> int:
+        if self._weight is None:
+            return 0
+
+        return sum(map(self._weight, items))
+
+    def _rebuild(self) -> None:
+        self._tree = _fenwick(map(len, self._blocks))
+        if self._weight is not None:
+            self._wtree = _fenwick(self._sums)
+
+    def _update(self, block: int, delta: int, weight: int) -> None:
+        _add(self._tree, block, delta)
+        if weight:
+            self._sums[block] += weight
+            _add(self._wtree, block, weight)
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        if index < 0:
+            index += self._len
+
+        if not 0 <= index < self._len:
+            msg = "IndexedList index out of range"
+            raise IndexError(msg)
+
+        # Binary lifting down the Fenwick tree, finds the first block whose
+        # cumulative length exceeds `index`.
+        tree = self._tree
+        pos = 0
+        step = 1 << (len(tree).bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                pos = nxt
+                index -= tree[nxt]
+            step >>= 1
+
+        return pos, index
+
+    def _chunk(self, block: int) -> None:
+        items = self._blocks[block]
+        chunks = [items[i : i + LOAD] for i in range(0, len(items), LOAD)]
+        self._blocks[block : block + 1] = chunks
+        self._sums[block : block + 1] = map(self._sum, chunks)
+        self._rebuild()
+
+    def _shrink(self, block: int) -> None:
+        blocks = self._blocks
+        items = blocks[block]
+
+        if not items:
+            del blocks[block]
+            del self._sums[block]
+            self._rebuild()
+        elif len(items) < LOAD // 2 and block + 1 < len(blocks):
+            # Merge small blocks so the tree does not grow with deletions.
+            items.extend(blocks.pop(block + 1))
+            self._sums[block] += self._sums.pop(block + 1)
+            if len(items) > LOAD * 2:
+                self._chunk(block)
+            else:
+                self._rebuild()
+
+    @property
+    def total(self) -> int:
+        """The sum of every item's weight."""
+
+        return self._total
+
+    def prefix(self, index: int) -> int:
+        """The sum of the weights of the items before ``index``."""
+
+        if index >= self._len:
+            return self._total
+
+        if index <= 0:
+            return 0
+
+        block, offset = self._locate(index)
+        return _prefix(self._wtree, block) + self._sum(self._blocks[block][:offset])
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __iter__(self) -> Iterator[T]:
+        return chain.from_iterable(self._blocks)
+
+    def __getitem__(self, index: int) -> T:
+        block, offset = self._locate(index)
+        return self._blocks[block][offset]
+
+    def __setitem__(self, index: int, value: T) -> None:
+        block, offset = self._locate(index)
+        items = self._blocks[block]
+        weight = self._sum((value,)) - self._sum((items[offset],))
+        items[offset] = value
+        self._total += weight
+        self._update(block, 0, weight)
+
+    def __delitem__(self, index: int) -> None:
+        self.pop(index)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def islice(self, start: int, stop: int) -> Iterator[T]:
+        """Iterate over ``self[start:stop]``, starting at the block of ``start``."""
+
+        start = max(start, 0)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return iter(())
+
+        block, offset = self._locate(start)
+        items = chain(
+            self._blocks[block][offset:], chain.from_iterable(self._blocks[block + 1 :])
+        )
+        return islice(items, stop - start)
+
+    def append(self, value: T) -> None:
+        weight = self._sum((value,))
+        self._len += 1
+        self._total += weight
+
+        if not self._blocks or len(self._blocks[-1]) >= LOAD:
+            self._blocks.append([value])
+            self._sums.append(weight)
+            self._rebuild()
+            return
+
+        self._blocks[-1].append(value)
+        self._update(len(self._blocks) - 1, 1, weight)
+
+    def extend(self, values: Iterable[T]) -> None:
+        values = list(values)
+        if not values:
+            return
+
+        blocks = self._blocks
+        if blocks and len(blocks[-1]) < LOAD:
+            space = LOAD - len(blocks[-1])
+            head, values = values[:space], values[space:]
+            blocks[-1].extend(head)
+            weight = self._sum(head)
+            self._len += len(head)
+            self._total += weight
+            self._update(len(blocks) - 1, len(head), weight)
+
+        if not values:
+            return
+
+        # Only new blocks need the trees rebuilt.
+        chunks = [values[i : i + LOAD] for i in range(0, len(values), LOAD)]
+        sums = list(map(self._sum, chunks))
+        blocks.extend(chunks)
+        self._sums.extend(sums)
+        self._len += len(values)
+        self._total += sum(sums)
+        self._rebuild()
+
+    def insert(self, index: int, value: T) -> None:
+        if index < 0:
+            index = max(index + self._len, 0)
+
+        if index >= self._len:
+            self.append(value)
+            return
+
+        block, offset = self._locate(index)
+        items = self._blocks[block]
+        items.insert(offset, value)
+        weight = self._sum((value,))
+        self._len += 1
+        self._total += weight
+
+        if len(items) > LOAD * 2:
+            self._sums[block] += weight
+            self._chunk(block)
+        else:
+            self._update(block, 1, weight)
+
+    def insert_many(self, index: int, values: Iterable[T]) -> None:
+        values = list(values)
+        if index < 0:
+            index = max(index + self._len, 0)
+
+        if index >= self._len:
+            self.extend(values)
+            return
+
+        block, offset = self._locate(index)
+        items = self._blocks[block]
+        items[offset:offset] = values
+        weight = self._sum(values)
+        self._len += len(values)
+        self._total += weight
+
+        if len(items) > LOAD * 2:
+            self._sums[block] += weight
+            self._chunk(block)
+        else:
+            self._update(block, len(values), weight)
+
+    def pop(self, index: int = -1) -> T:
+        block, offset = self._locate(index)
+        value = self._blocks[block].pop(offset)
+        weight = self._sum((value,))
+        self._len -= 1
+        self._total -= weight
+        self._update(block, -1, -weight)
+        self._shrink(block)
+        return value
+
+    def popleft(self) -> T:
+        return self.pop(0)
+
+    def delete_range(self, start: int, stop: int) -> None:
+        """Delete ``self[start:stop]`` without walking it item by item."""
+
+        start = max(start, 0)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return
+
+        block, offset = self._locate(start)
+        first = block
+        remaining = stop - start
+        while remaining:
+            items = self._blocks[block]
+            end = min(offset + remaining, len(items))
+            weight = self._sum(items[offset:end])
+            self._total -= weight
+            self._update(block, offset - end, -weight)
+            del items[offset:end]
+            remaining -= end - offset
+            block += 1
+            offset = 0
+
+        self._len -= stop - start
+        if any(not items for items in self._blocks[first:block]):
+            kept = [i for i, items in enumerate(self._blocks) if items]
+            self._blocks = [self._blocks[i] for i in kept]
+            self._sums = [self._sums[i] for i in kept]
+            self._rebuild()
+
+    def move(self, source: int, destination: int) -> None:
+        self.insert(destination, self.pop(source))
+
+    def clear(self) -> None:
+        self._blocks.clear()
+        self._sums.clear()
+        self._tree = [0]
+        self._wtree = [0]
+        self._len = 0
+        self._total = 0
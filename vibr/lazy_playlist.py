@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import re
+from asyncio import Task, gather
+from logging import getLogger
+from os import getenv
+from typing import TYPE_CHECKING, cast
+
+from async_spotify.spotify_errors import SpotifyAPIError
+from mafic import Playlist, SearchType, Track
+
+if TYPE_CHECKING:
+    from vibr.bot import Vibr
+    from vibr.exts.spotify._types import SpotifyTrack
+    from vibr.player import Player
+
+__all__ = ("SPOTIFY_PLAYLIST_RE", "PlaylistResolver", "fetch_spotify_playlist")
+
+log = getLogger(__name__)
+
+SPOTIFY_PLAYLIST_RE = re.compile(
+    r"^https?://open\.spotify\.com/(?:[\w-]+/)?playlist/(?P<id>[A-Za-z0-9]+)"
+)
+RESOLVE_WINDOW = int(getenv("RESOLVE_WINDOW", "5"))
+PAGE_SIZE = 100
+DEFAULT_ARTWORK = "http://clipground.com/images/tone-duration-clipart-16.jpg"
+
+
+def placeholder(item: SpotifyTrack) -> Track | None:
+    """Build a track without a Lavalink ID from a Spotify playlist item.
+
+    :meth:`vibr.player.Player.play` plays these by their URI, and
+    :class:`PlaylistResolver` swaps them for loaded tracks before they play.
+    """
+
+    info = item["track"]
+    if item["is_local"] or not info:
+        return None
+
+    images = info["album"]["images"]
+    return Track(
+        track_id="",
+        title=info["name"],
+        author=", ".join(artist["name"] for artist in info["artists"]),
+        identifier=info["id"],
+        uri=info["external_urls"]["spotify"],
+        source="spotify",
+        stream=False,
+        seekable=True,
+        length=info["duration_ms"],
+        artwork_url=images[0]["url"] if images else None,
+        isrc=info.get("external_ids", {}).get("isrc"),
+    )
+
+
+async def fetch_spotify_playlist(
+    bot: Vibr, playlist_id: str, *, limit: int
+) -> Playlist | None:
+    """Fetch a Spotify playlist as placeholder tracks, without Lavalink.
+
+    Parameters
+    ----------
+    bot:
+        The bot, for its Spotify client.
+    playlist_id:
+        The ID of the playlist.
+    limit:
+        The most tracks to fetch, pages after this are not requested.
+
+    Returns
+    -------
+    Playlist | None
+        The playlist, or ``None`` if Spotify could not be used, in which case
+        the playlist should be loaded through Lavalink.
+    """
+
+    try:
+        data = await bot.spotify.playlists.get_one(playlist_id)
+        first = data["tracks"]
+        pages = await gather(
+            *(
+                bot.spotify.playlists.get_tracks(
+                    playlist_id, offset=offset, limit=PAGE_SIZE
+                )
+                for offset in range(
+                    len(first["items"]), min(first["total"], limit), PAGE_SIZE
+                )
+            )
+        )
+    except SpotifyAPIError:
+        log.warning("Could not fetch playlist %s from Spotify", playlist_id)
+        return None
+
+    items = cast("list[SpotifyTrack]", first["items"])
+    for page in pages:
+        items.extend(page["items"])
+
+    playlist = Playlist(
+        info={"name": data["name"], "selectedTrack": -1},
+        tracks=[],
+        plugin_info={
+            "artworkUrl": data["images"][0]["url"]
+            if data.get("images")
+            else DEFAULT_ARTWORK
+        },
+    )
+    playlist.tracks = [
+        track for item in items[:limit] if (track := placeholder(item)) is not None
+    ]
+    return playlist
+
+
+class PlaylistResolver:
+    """Loads placeholder tracks in a window ahead of the play head.
+
+    Only the next ``RESOLVE_WINDOW`` tracks are loaded, so a long playlist
+    costs one load per track as it is reached rather than all of them up front.
+    Placeholders that could not be loaded are left for :meth:`Player.play` to
+    play by URI.
+    """
+
+    def __init__(self, player: Player) -> None:
+        self.player = player
+        self._task: Task[None] | None = None
+        self._failed: set[str] = set()
+
+    def _pending(self) -> list[tuple[int, str]]:
+        return [
+            (slot, uri)
+            for slot, uri in self.player.queue.unresolved(RESOLVE_WINDOW)
+            if uri not in self._failed
+        ]
+
+    def schedule(self) -> None:
+        """Start resolving in the background, if anything needs it."""
+
+        if self._task is not None and not self._task.done():
+            return
+
+        if self._pending():
+            self._task = self.player.client.loop.create_task(self._run())
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _resolve(self, slot: int, uri: str) -> None:
+        try:
+            result = await self.player.client.tracks.fetch_tracks(
+                self.player.node, uri, search_type=SearchType.YOUTUBE.value
+            )
+        except Exception:
+            log.debug("Failed to resolve %s", uri, exc_info=True)
+            result = None
+
+        if isinstance(result, Playlist):
+            result = result.tracks
+
+        if not result:
+            self._failed.add(uri)
+            return
+
+        self.player.queue.resolve(slot, uri, result[0])
+
+    async def _run(self) -> None:
+        # The queue may change while loading, so the window is checked again.
+        while pending := self._pending():
+            await gather(*(self._resolve(slot, uri) for slot, uri in pending))
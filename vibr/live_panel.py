@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from asyncio import Event, sleep, wait_for
+from asyncio import TimeoutError as AsyncTimeoutError
+from contextlib import suppress
+from logging import getLogger
+from os import getenv
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from nextcord import HTTPException, NotFound
+
+from vibr.embed import Embed
+from vibr.outbox import Priority, outbox
+from vibr.track_embed import progress_bar, track_embed
+from vibr.track_store import track_key
+from vibr.utils import truncate
+
+if TYPE_CHECKING:
+    from nextcord import Message
+    from nextcord.abc import Messageable
+
+    from vibr.buttons import PlayButtons
+    from vibr.player import Player
+
+__all__ = ("LivePanel",)
+
+log = getLogger(__name__)
+
+# The outbox spaces messages to a channel too, this leaves room for the rest of
+# the bot's messages.
+EDIT_INTERVAL = float(getenv("LIVE_PANEL_EDIT_INTERVAL", "2"))
+PROGRESS_INTERVAL = float(getenv("LIVE_PANEL_PROGRESS_INTERVAL", "15"))
+UP_NEXT = 3
+
+
+class LivePanel:
+    """One message per player, edited to show what is playing.
+
+    Changes are coalesced, the message is edited at most once every
+    ``EDIT_INTERVAL`` seconds however often :meth:`refresh` is called, and
+    every ``PROGRESS_INTERVAL`` seconds while playing to move the progress bar.
+
+    Parameters
+    ----------
+    player:
+        The player to show.
+    channel:
+        Where to send the message.
+    """
+
+    def __init__(self, player: Player, channel: Messageable) -> None:
+        self.player = player
+        self.channel = channel
+        self.message: Message | None = None
+        # Keys of the track the message's buttons are for, and of the track
+        # already logged when it was played. Tracks are compared by key, the
+        # player builds a new one whenever it is paused, seeked and so on.
+        self._shown: str | None = None
+        self._logged = self._key()
+        self._changed = Event()
+        self._changed.set()
+        self._task = player.client.loop.create_task(self._run())
+
+    def refresh(self) -> None:
+        """Show the player's state soon."""
+
+        self._changed.set()
+
+    def stop(self) -> None:
+        self._task.cancel()
+
+    def _key(self) -> str | None:
+        current = self.player.current
+        return None if current is None else track_key(current)
+
+    async def _run(self) -> None:
+        last_edit = 0.0
+        while True:
+            timeout = (
+                PROGRESS_INTERVAL
+                if self.player.current is not None and not self.player.paused
+                else None
+            )
+            with suppress(AsyncTimeoutError):
+                await wait_for(self._changed.wait(), timeout=timeout)
+
+            # Changes made while waiting here share the edit.
+            await sleep(max(last_edit + EDIT_INTERVAL - monotonic(), 0))
+            self._changed.clear()
+            try:
+                # Takes the place of the track embeds and end of queue messages.
+                await outbox.run(
+                    self.channel.id,
+                    self._show,
+                    priority=Priority.PLAYER,
+                    key="player",
+                )
+            except HTTPException:
+                log.warning("Failed to update live panel in %s", self.channel)
+            except Exception:
+                # Keep the panel going, the next change tries again.
+                log.exception("Error updating live panel in %s", self.channel)
+            last_edit = monotonic()
+
+    async def _render(self, *, buttons: bool) -> tuple[Embed, PlayButtons | None]:
+        current = self.player.current
+        if current is None:
+            return Embed(title="End of Queue"), None
+
+        history = self.player.queue.history.last(1)
+        requester = history[0][1] if history else 0
+        key = track_key(current)
+        embed, view = await track_embed(
+            current,
+            user=requester,
+            looping=self.player.queue.loop_type is not None,
+            # Logged once per track, not on every edit.
+            log_play=key != self._logged,
+        )
+        self._logged = key
+        embed.description = (
+            f"Requested by <@{requester}>\n"
+            f"{progress_bar(self.player.position, current.length)}"
+        )
+        if up_next := self.player.queue.page(0, UP_NEXT):
+            embed.add_field(
+                name="Up Next",
+                value="\n".join(
+                    f"{index}. {truncate(track.title, length=50)}"
+                    for index, track in enumerate(up_next, start=1)
+                ),
+                inline=False,
+            )
+
+        return embed, view if buttons else None
+
+    async def _show(self) -> None:
+        current = self._key()
+        # Progress edits keep the buttons they have.
+        buttons = current != self._shown
+        if self.message is not None:
+            embed, view = await self._render(buttons=buttons)
+            try:
+                if buttons:
+                    await self.message.edit(embed=embed, view=view)
+                else:
+                    await self.message.edit(embed=embed)
+            except NotFound:
+                self.message = None
+            else:
+                self._shown = current
+                return
+
+        embed, view = await self._render(buttons=True)
+        self.message = await self.channel.send(embed=embed, view=view)
+        self._shown = current
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+from asyncio import FIRST_COMPLETED, CancelledError, Task, create_task, wait
+from asyncio import TimeoutError as AsyncTimeoutError
+from collections import defaultdict, deque
+from logging import getLogger
+from os import getenv
+from time import monotonic, perf_counter
+from typing import TYPE_CHECKING, TypeVar
+
+from aiohttp import ClientError
+from mafic import HTTPException, NoNodesAvailable
+from prometheus_client import Counter, Histogram
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from mafic import Node, NodePool
+
+    from vibr.bot import Vibr
+
+__all__ = ("NodeSelector",)
+
+log = getLogger(__name__)
+
+T = TypeVar("T")
+
+# Weight added per millisecond of average REST latency, one playing player
+# is worth roughly one.
+LATENCY_WEIGHT = float(getenv("NODE_LATENCY_WEIGHT", "0.1"))
+# How much each new request moves the average latency.
+SMOOTHING = 0.2
+# How long a node is passed over after a request to it fails.
+FAILURE_COOLDOWN = float(getenv("NODE_FAILURE_COOLDOWN", "30"))
+
+# The percentile of a node's recent latency to wait for before hedging.
+HEDGE_PERCENTILE = float(getenv("HEDGE_PERCENTILE", "95"))
+# Hedges allowed per hedgeable request, 0 turns hedging off.
+HEDGE_BUDGET = float(getenv("HEDGE_BUDGET", "0.05"))
+# The most hedges that can be saved up and sent in a burst.
+HEDGE_BURST = 10.0
+# How long to wait before hedging until there are enough samples.
+HEDGE_DEFAULT_DELAY = 1.0
+LATENCY_SAMPLES = 200
+MIN_SAMPLES = 20
+
+# Errors of the node rather than the request, worth trying another node for.
+NODE_ERRORS = (HTTPException, ClientError, AsyncTimeoutError)
+
+
+class NodeSelector:
+    """Picks the Lavalink node for requests that need no player, like searches.
+
+    Nodes are ranked by :attr:`mafic.Node.weight`, which covers CPU load,
+    playing players and frame deficit, plus the average latency of their REST
+    requests. Unavailable nodes are skipped, and a request that fails on one
+    node is retried on the next, with the failed node ranked last until
+    ``FAILURE_COOLDOWN`` passes.
+
+    Hedged requests are also sent to the second best node if the best one is
+    slower than ``HEDGE_PERCENTILE`` of its recent requests, and the first
+    answer wins. Hedges are limited to ``HEDGE_BUDGET`` of hedged requests.
+
+    Parameters
+    ----------
+    pool:
+        The pool to pick nodes from.
+    """
+
+    def __init__(self, pool: NodePool[Vibr]) -> None:
+        self.pool = pool
+        # Average REST latency in seconds, by node label.
+        self._latency: dict[str, float] = {}
+        self._samples: defaultdict[str, deque[float]] = defaultdict(
+            lambda: deque(maxlen=LATENCY_SAMPLES)
+        )
+        # Recent latency of every node, for nodes with too few samples.
+        self._all_samples: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        # When the last request failed, by node label.
+        self._failed: dict[str, float] = {}
+        self._hedge_tokens = 1.0
+        self.failovers = Counter(
+            "vibr_node_failovers",
+            "REST requests retried on another node after failing",
+            labelnames=["node"],
+        )
+        self.latency = Histogram(
+            "vibr_node_rest_seconds",
+            "Latency of REST requests to a node",
+            labelnames=["node"],
+        )
+        self.hedges = Counter(
+            "vibr_node_hedges",
+            "Hedged requests that were slow, by what happened to the hedge",
+            labelnames=["outcome"],
+        )
+
+    def score(self, node: Node[Vibr]) -> tuple[bool, float]:
+        """The cost of sending a request to ``node``, lower is better."""
+
+        failed = self._failed.get(node.label)
+        cooling = failed is not None and monotonic() - failed < FAILURE_COOLDOWN
+        latency = self._latency.get(node.label, 0.0)
+        return cooling, node.weight + latency * 1000 * LATENCY_WEIGHT
+
+    def ranked(self) -> list[Node[Vibr]]:
+        """The available nodes, best first."""
+
+        return sorted(
+            (node for node in self.pool.nodes if node.available), key=self.score
+        )
+
+    def observe(self, node: Node[Vibr], seconds: float) -> None:
+        if (average := self._latency.get(node.label)) is None:
+            self._latency[node.label] = seconds
+        else:
+            self._latency[node.label] = average + SMOOTHING * (seconds - average)
+
+        self._samples[node.label].append(seconds)
+        self._all_samples.append(seconds)
+        self.latency.labels(node.label).observe(seconds)
+
+    def hedge_delay(self, node: Node[Vibr]) -> float:
+        """How long to wait for ``node`` before hedging."""
+
+        samples = self._samples[node.label]
+        if len(samples) < MIN_SAMPLES:
+            samples = self._all_samples
+        if len(samples) < MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+
+        ordered = sorted(samples)
+        return ordered[round((len(ordered) - 1) * HEDGE_PERCENTILE / 100)]
+
+    async def run(
+        self, call: Callable[[Node[Vibr]], Awaitable[T]], *, hedge: bool = False
+    ) -> T:
+        """Run ``call`` on the best node, failing over to the next ones.
+
+        Parameters
+        ----------
+        call:
+            The request, given the node to send it to.
+        hedge:
+            Whether to also send the request to a second node if the first
+            is slow. Only for requests that are safe to send twice.
+
+        Raises
+        ------
+        NoNodesAvailable
+            No node is available.
+        """
+
+        nodes = self.ranked()
+        if not nodes:
+            raise NoNodesAvailable
+
+        if hedge and HEDGE_BUDGET > 0 and len(nodes) > 1:
+            self._hedge_tokens = min(self._hedge_tokens + HEDGE_BUDGET, HEDGE_BURST)
+            return await self._hedged(nodes, call)
+
+        return await self._failover(nodes, call)
+
+    async def _failover(
+        self, nodes: list[Node[Vibr]], call: Callable[[Node[Vibr]], Awaitable[T]]
+    ) -> T:
+        for node in nodes[:-1]:
+            try:
+                return await self._timed(node, call)
+            except NODE_ERRORS:
+                self._failed_over(node)
+
+        # The last node's error is the caller's to handle.
+        return await self._timed(nodes[-1], call)
+
+    async def _hedged(
+        self, nodes: list[Node[Vibr]], call: Callable[[Node[Vibr]], Awaitable[T]]
+    ) -> T:
+        primary, secondary, *rest = nodes
+        first = create_task(self._timed(primary, call))
+        try:
+            done, _ = await wait((first,), timeout=self.hedge_delay(primary))
+        except CancelledError:
+            first.cancel()
+            raise
+
+        if not done:
+            if self._hedge_tokens < 1:
+                self.hedges.labels("over_budget").inc()
+            else:
+                self._hedge_tokens -= 1
+                return await self._race(first, primary, secondary, call, rest)
+
+        try:
+            return await first
+        except NODE_ERRORS:
+            self._failed_over(primary)
+
+        return await self._failover([secondary, *rest], call)
+
+    async def _race(
+        self,
+        first: Task[T],
+        primary: Node[Vibr],
+        secondary: Node[Vibr],
+        call: Callable[[Node[Vibr]], Awaitable[T]],
+        rest: list[Node[Vibr]],
+    ) -> T:
+        second = create_task(self._timed(secondary, call))
+        nodes = {first: primary, second: secondary}
+        pending = set(nodes)
+        try:
+            while pending:
+                done, pending = await wait(pending, return_when=FIRST_COMPLETED)
+                for task in done:
+                    if (error := task.exception()) is None:
+                        self.hedges.labels("won" if task is second else "lost").inc()
+                        return task.result()
+
+                    if not isinstance(error, NODE_ERRORS):
+                        raise error
+
+                    log.warning(
+                        "Request failed on node %s", nodes[task].label, exc_info=error
+                    )
+                    self.failovers.labels(nodes[task].label).inc()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        self.hedges.labels("failed").inc()
+        if not rest:
+            raise error
+
+        return await self._failover(rest, call)
+
+    async def _timed(
+        self, node: Node[Vibr], call: Callable[[Node[Vibr]], Awaitable[T]]
+    ) -> T:
+        start = perf_counter()
+        try:
+            result = await call(node)
+        except NODE_ERRORS:
+            self._failed[node.label] = monotonic()
+            raise
+        except CancelledError:
+            # Lost a hedge, it took at least this long.
+            self.observe(node, perf_counter() - start)
+            raise
+
+        self.observe(node, perf_counter() - start)
+        self._failed.pop(node.label, None)
+        return result
+
+    def _failed_over(self, node: Node[Vibr]) -> None:
+        log.warning("Request failed on node %s", node.label, exc_info=True)
+        self.failovers.labels(node.label).inc()
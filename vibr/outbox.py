@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+from asyncio import Event, Future, Task, get_running_loop, sleep, wait_for
+from asyncio import TimeoutError as AsyncTimeoutError
+from contextlib import suppress
+from dataclasses import dataclass, field
+from enum import IntEnum
+from itertools import count
+from logging import getLogger
+from os import getenv
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+
+from prometheus_client import Counter, Gauge, Histogram
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Hashable
+
+__all__ = ("Outbox", "Priority", "outbox")
+
+log = getLogger(__name__)
+
+T = TypeVar("T")
+
+# Discord allows 50 requests a second for the whole bot, the rest is left for
+# interaction responses and everything else.
+RATE = float(getenv("OUTBOX_RATE", "25"))
+BURST = float(getenv("OUTBOX_BURST", str(RATE)))
+# Discord allows 5 messages a channel every 5 seconds.
+CHANNEL_INTERVAL = float(getenv("OUTBOX_CHANNEL_INTERVAL", "1"))
+# Notifications this late are no longer worth sending.
+MAX_DELAY = float(getenv("OUTBOX_MAX_DELAY", "30"))
+
+
+class Priority(IntEnum):
+    """Which messages are sent first, lowest first.
+
+    Interaction responses are not queued, they are answered straight away and
+    counted against the same budget with :meth:`Outbox.interaction`.
+    """
+
+    NOTICE = 0
+    """Player notices, like pausing due to no listeners."""
+    PLAYER = 1
+    """What is playing, like track embeds and the live panel."""
+    EDIT = 2
+    """Disabling the buttons of timed out views."""
+
+
+delay = Histogram(
+    "vibr_outbox_delay_seconds",
+    "Time messages spent queued before being sent",
+    labelnames=["priority"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+dropped = Counter(
+    "vibr_outbox_dropped",
+    "Queued messages that were not sent, by why",
+    labelnames=["priority", "reason"],
+)
+sent = Counter(
+    "vibr_outbox_sent",
+    "Queued messages sent",
+    labelnames=["priority"],
+)
+pending = Gauge("vibr_outbox_pending", "Messages queued to be sent")
+
+
+@dataclass
+class _Item(Generic[T]):
+    priority: Priority
+    order: int
+    send: Callable[[], Awaitable[T]]
+    future: Future[T | None]
+    queued: float = field(default_factory=monotonic)
+
+
+class Outbox:
+    """Sends the messages the bot sends on its own, by priority.
+
+    Messages to each channel are spaced ``CHANNEL_INTERVAL`` apart and all
+    messages are limited to ``RATE`` a second, so bursts queue here instead of
+    hitting Discord's rate limits and holding up interaction responses. A
+    message queued with the same key as one still waiting replaces it, and
+    messages waiting longer than ``MAX_DELAY`` are dropped.
+    """
+
+    def __init__(self) -> None:
+        # Waiting messages by bucket and key, in the order they were queued.
+        self._pending: dict[Hashable, dict[Hashable, _Item[Any]]] = {}
+        # Buckets with a message being sent.
+        self._busy: set[Hashable] = set()
+        # When each bucket can be sent to again.
+        self._ready: dict[Hashable, float] = {}
+        self._tokens = BURST
+        self._refilled = monotonic()
+        self._order = count()
+        self._changed = Event()
+        self._task: Task[None] | None = None
+        # Messages being sent, referenced until they are done.
+        self._sending: set[Task[None]] = set()
+        pending.set_function(lambda: sum(map(len, self._pending.values())))
+
+    def interaction(self) -> None:
+        """Count an interaction response, queued messages make way for it."""
+
+        self._refill()
+        self._tokens = max(self._tokens - 1, -BURST)
+
+    async def run(
+        self,
+        bucket: Hashable,
+        send: Callable[[], Awaitable[T]],
+        *,
+        priority: Priority,
+        key: Hashable | None = None,
+    ) -> T | None:
+        """Queue ``send`` and wait for it to be called.
+
+        Parameters
+        ----------
+        bucket:
+            What the message is rate limited by, usually the channel ID.
+        send:
+            Sends the message.
+        priority:
+            Which messages go first.
+        key:
+            Replaces a message in ``bucket`` with the same key that is still
+            waiting, which then returns ``None``.
+
+        Returns
+        -------
+        T | None
+            What ``send`` returned, or ``None`` if it was dropped.
+        """
+
+        if self._task is None or self._task.done():
+            self._task = get_running_loop().create_task(self._run())
+
+        items = self._pending.setdefault(bucket, {})
+        order = next(self._order)
+        if key is None:
+            key = object()
+        elif (old := items.pop(key, None)) is not None:
+            # Takes the place of the one it replaces.
+            order = old.order
+            self._drop(old, "superseded")
+
+        future: Future[T | None] = get_running_loop().create_future()
+        items[key] = _Item(priority, order, send, future)
+        self._changed.set()
+        return await future
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        for task in self._sending:
+            task.cancel()
+
+        for items in self._pending.values():
+            for item in items.values():
+                self._drop(item, "closed")
+        self._pending.clear()
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(self._tokens + (now - self._refilled) * RATE, BURST)
+        self._refilled = now
+
+    def _drop(self, item: _Item[Any], reason: str) -> None:
+        dropped.labels(item.priority.name.lower(), reason).inc()
+        if not item.future.done():
+            item.future.set_result(None)
+
+    def _next(self) -> tuple[Hashable, Hashable, _Item[Any]] | None:
+        # The first queued message of the best priority in a bucket that is free.
+        now = monotonic()
+        best = None
+        for bucket, items in list(self._pending.items()):
+            for key, item in list(items.items()):
+                if item.future.done():
+                    # The caller stopped waiting.
+                    del items[key]
+                elif now - item.queued > MAX_DELAY:
+                    del items[key]
+                    self._drop(item, "expired")
+
+            if not items:
+                del self._pending[bucket]
+                continue
+
+            if bucket in self._busy or self._ready.get(bucket, 0) > now:
+                continue
+
+            key, item = min(
+                items.items(), key=lambda pair: (pair[1].priority, pair[1].order)
+            )
+            if best is None or (item.priority, item.order) < (
+                best[2].priority,
+                best[2].order,
+            ):
+                best = bucket, key, item
+
+        return best
+
+    def _wait_time(self) -> float | None:
+        # Until a bucket with queued messages is free, or forever if none.
+        now = monotonic()
+        times = [
+            self._ready.get(bucket, 0) - now
+            for bucket in self._pending
+            if bucket not in self._busy
+        ]
+        return max(min(times), 0) if times else None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._dispatch()
+            except Exception:
+                # Everything queued would wait forever if this stopped.
+                log.exception("Error dispatching queued messages")
+                await sleep(1)
+
+    async def _dispatch(self) -> None:
+        self._refill()
+        if self._tokens < 1:
+            await sleep((1 - self._tokens) / RATE)
+            return
+
+        self._changed.clear()
+        if (found := self._next()) is None:
+            now = monotonic()
+            self._ready = {b: t for b, t in self._ready.items() if t > now}
+            with suppress(AsyncTimeoutError):
+                await wait_for(self._changed.wait(), timeout=self._wait_time())
+            return
+
+        bucket, key, item = found
+        del self._pending[bucket][key]
+        self._tokens -= 1
+        self._busy.add(bucket)
+        task = get_running_loop().create_task(self._send(bucket, item))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, bucket: Hashable, item: _Item[Any]) -> None:
+        priority = item.priority.name.lower()
+        delay.labels(priority).observe(monotonic() - item.queued)
+        try:
+            result = await item.send()
+        except Exception as e:  # noqa: BLE001
+            # Passed on to the caller to handle.
+            dropped.labels(priority, "failed").inc()
+            if not item.future.done():
+                item.future.set_exception(e)
+        else:
+            sent.labels(priority).inc()
+            if not item.future.done():
+                item.future.set_result(result)
+        finally:
+            self._busy.discard(bucket)
+            self._ready[bucket] = monotonic() + CHANNEL_INTERVAL
+            self._changed.set()
+
+
+outbox = Outbox()
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import math
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from heapq import nlargest
+from logging import getLogger
+from os import getenv
+from sys import intern
+from typing import TYPE_CHECKING
+
+from cachetools import LRUCache
+
+from vibr.db import SongLog
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Iterable
+
+__all__ = ("PlayIndex",)
+
+log = getLogger(__name__)
+
+GLOBAL_SIZE = int(getenv("PLAY_INDEX_SIZE", "50000"))
+# Tracks added as they play grow the index up to this, then the least played
+# are dropped back down to `GLOBAL_SIZE`.
+MAX_SIZE = int(getenv("PLAY_INDEX_MAX_SIZE", str(GLOBAL_SIZE * 2)))
+USER_SIZE = 1000
+# Once this many documents match the rarest terms of a search, the more common
+# terms only score those instead of finding more.
+MAX_CANDIDATES = int(getenv("PLAY_INDEX_MAX_CANDIDATES", "5000"))
+CACHED_USERS = int(getenv("PLAY_INDEX_USERS", "10000"))
+NON_WORD_RE = re.compile(r"[\W_]+")
+# The share of the query's weight a track must match to be suggested.
+MIN_MATCH = 0.3
+
+
+def grams(text: str) -> set[str]:
+    """The character trigrams of ``text``, ignoring case and punctuation."""
+
+    text = f" {NON_WORD_RE.sub(' ', text.casefold()).strip()} "
+    return {intern(text[i : i + 3]) for i in range(len(text) - 2)}
+
+
+def _score_found(scores: dict[int, float], postings: list[int], weight: float) -> None:
+    # Whichever takes fewer steps, looking each document up in the sorted
+    # postings or going through the postings.
+    if len(scores) * math.log2(len(postings) or 1) < len(postings):
+        for doc in scores:
+            index = bisect_left(postings, doc)
+            if index < len(postings) and postings[index] == doc:
+                scores[doc] += weight
+    else:
+        for doc in postings:
+            if doc in scores:
+                scores[doc] += weight
+
+
+class PlayIndex:
+    """A search index over previously played tracks, for autocomplete.
+
+    Tracks are matched on the character trigrams of their title and author,
+    weighted by TF-IDF, so partial words and typos still match. The most
+    played tracks overall are loaded on startup, and a user's own plays the
+    first time they autocomplete. Tracks are added as they play, and once
+    there are ``MAX_SIZE`` the least played are dropped.
+    """
+
+    def __init__(self) -> None:
+        # (title, author, uri) by document ID.
+        self._docs: list[tuple[str, str, str]] = []
+        self._ids: dict[str, int] = {}
+        self._norms: list[float] = []
+        self._plays: list[int] = []
+        self._postings: defaultdict[str, list[int]] = defaultdict(list)
+        # Play count of each document for a user.
+        self._users: LRUCache[int, dict[int, int]] = LRUCache(maxsize=CACHED_USERS)
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _add(self, title: str, author: str, uri: str, amount: int) -> int:
+        if (doc := self._ids.get(uri)) is not None:
+            self._plays[doc] += amount
+            return doc
+
+        doc = len(self._docs)
+        terms = grams(f"{title} {author}")
+        self._docs.append((title, author, uri))
+        self._ids[uri] = doc
+        self._norms.append(math.sqrt(len(terms)) or 1.0)
+        self._plays.append(amount)
+        for term in terms:
+            self._postings[term].append(doc)
+
+        return doc
+
+    def add(self, user: int, title: str, author: str, uri: str) -> None:
+        """Record a play, adding the track if it is new."""
+
+        doc = self._add(title, author, uri, 1)
+        if (plays := self._users.get(user)) is not None:
+            plays[doc] = plays.get(doc, 0) + 1
+
+        if len(self._docs) > MAX_SIZE:
+            self._compact()
+
+    def _compact(self, *, keep_docs: Collection[int] = ()) -> None:
+        # Renumbers documents, so postings can stay plain lists. Each compaction
+        # follows `MAX_SIZE - GLOBAL_SIZE` new tracks. `keep_docs` are kept as
+        # well, so a user being loaded does not lose their own tracks.
+        keep = sorted(
+            set(
+                nlargest(
+                    GLOBAL_SIZE, range(len(self._docs)), key=self._plays.__getitem__
+                )
+            ).union(keep_docs)
+        )
+        renumbered = {old: new for new, old in enumerate(keep)}
+        self._docs = [self._docs[doc] for doc in keep]
+        self._norms = [self._norms[doc] for doc in keep]
+        self._plays = [self._plays[doc] for doc in keep]
+        self._ids = {uri: doc for doc, (_, _, uri) in enumerate(self._docs)}
+        for term, postings in list(self._postings.items()):
+            # Still in ascending order, as `keep` is sorted.
+            if kept := [renumbered[doc] for doc in postings if doc in renumbered]:
+                self._postings[term] = kept
+            else:
+                del self._postings[term]
+
+        for user, plays in list(self._users.items()):
+            if plays.keys() <= renumbered.keys():
+                self._users[user] = {renumbered[doc]: n for doc, n in plays.items()}
+            else:
+                # Lost some of their tracks, loaded again when next used.
+                del self._users[user]
+
+        log.info("Dropped the least played tracks from the play index")
+
+    async def load(self) -> None:
+        """Load the most played tracks overall."""
+
+        # Set first, `on_ready` can be dispatched again while this loads.
+        self.loaded = True
+        rows = await SongLog.raw(
+            """SELECT uri, max(title) AS title, max(author) AS author,
+                sum(amount) AS amount
+            FROM song_log
+            WHERE uri IS NOT NULL AND title <> ''
+            GROUP BY uri
+            ORDER BY amount DESC
+            LIMIT {}
+            """,
+            GLOBAL_SIZE,
+        )
+        for row in rows:
+            self._add(row["title"], row["author"], row["uri"], row["amount"])
+
+        log.info("Loaded %d played tracks into the play index", len(rows))
+
+    async def _user(self, user: int) -> dict[int, int]:
+        if (plays := self._users.get(user)) is not None:
+            return plays
+
+        rows = await SongLog.raw(
+            """SELECT uri, title, author, amount
+            FROM song_log
+            WHERE user_id = {} AND uri IS NOT NULL AND title <> ''
+            ORDER BY amount DESC
+            LIMIT {}
+            """,
+            user,
+            USER_SIZE,
+        )
+        plays = self._users.get(user, {})
+        for row in rows:
+            # Already counted globally if loaded on startup.
+            doc = self._add(row["title"], row["author"], row["uri"], 0)
+            plays[doc] = row["amount"]
+
+        self._users[user] = plays
+        if len(self._docs) > MAX_SIZE:
+            self._compact(keep_docs=plays)
+            # Renumbered by the compaction.
+            plays = self._users[user]
+
+        return plays
+
+    def _scores(
+        self, query: str, *, always: Iterable[int]
+    ) -> tuple[dict[int, float], float]:
+        total = len(self._docs)
+        weights = {
+            term: math.log(1 + total / len(postings))
+            if (postings := self._postings.get(term))
+            else math.log(1 + total)
+            for term in grams(query)
+        }
+        minimum = sum(weights.values()) * MIN_MATCH
+
+        # Rarest first. Documents are found from the rarer terms until there
+        # are enough, then only checked for the rest, so common terms are not
+        # scanned. Documents with only the most common terms, together worth
+        # less than the minimum, could not match anyway. `always` are scored
+        # even if there are enough, like the user's own tracks.
+        terms = sorted(weights, key=weights.__getitem__, reverse=True)
+        scores: defaultdict[int, float] = defaultdict(float, dict.fromkeys(always, 0))
+        left = sum(weights.values())
+        for term in terms:
+            postings = self._postings.get(term, [])
+            weight = weights[term]
+            room = MAX_CANDIDATES - len(scores) if left >= minimum else 0
+            if len(postings) <= room:
+                for doc in postings:
+                    scores[doc] += weight
+            else:
+                _score_found(scores, postings, weight)
+                # The first documents are mostly the most played, loaded first.
+                for doc in postings[: max(room, 0)]:
+                    if doc not in scores:
+                        scores[doc] = weight
+
+            left -= weight
+
+        return scores, minimum
+
+    def _rank(
+        self,
+        scores: dict[int, float],
+        docs: Iterable[int],
+        *,
+        limit: int,
+    ) -> list[int]:
+        # Popularity only breaks near ties between similar matches.
+        return nlargest(
+            limit,
+            docs,
+            key=lambda doc: scores[doc] / self._norms[doc]
+            + math.log(1 + self._plays[doc]) / 100,
+        )
+
+    async def search(
+        self, user: int, query: str, *, limit: int = 25
+    ) -> list[tuple[str, str, str]]:
+        """Find played tracks, the user's own first, as ``(title, author, uri)``.
+
+        An empty query gives the user's most played tracks.
+        """
+
+        plays = await self._user(user)
+        if not query.strip():
+            docs = nlargest(limit, plays, key=plays.__getitem__)
+            return [self._docs[doc] for doc in docs]
+
+        scores, minimum = self._scores(query, always=plays)
+        matched = [doc for doc, score in scores.items() if score >= minimum]
+        docs = self._rank(scores, (doc for doc in matched if doc in plays), limit=limit)
+        if len(docs) < limit:
+            seen = set(docs)
+            docs += self._rank(
+                scores,
+                (doc for doc in matched if doc not in seen),
+                limit=limit - len(docs),
+            )
+
+        return [self._docs[doc] for doc in docs]
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import random
-from collections import deque
+from base64 import b64decode
 from enum import Enum, auto
+from itertools import zip_longest
+from os import getenv
 from typing import TYPE_CHECKING, Any
 
 import mafic
@@ -10,17 +12,29 @@ from mafic import Track
 
 from vibr.embed import Embed
 from vibr.errors import QueueFull
+from vibr.history import History
+from vibr.indexed_list import IndexedList
+from vibr.lazy_playlist import PlaylistResolver
+from vibr.outbox import Priority, outbox
+from vibr.track_store import TrackStore
 
 if TYPE_CHECKING:
     from asyncio import TimerHandle
-    from collections.abc import Coroutine, Sequence
+    from collections.abc import Coroutine, Iterator, Sequence
 
     from mafic import Node
     from mafic.type_variables import ClientT
     from nextcord.abc import Connectable, Messageable
 
+    from vibr.live_panel import LivePanel
+    from vibr.track_store import Record
+
+    Change = tuple[str, int, int] | tuple[str, int, list[Record]]
+
 __all__ = ("Player", "Queue")
-MAX_QUEUE_LENGTH = 500
+MAX_QUEUE_LENGTH = int(getenv("MAX_QUEUE_LENGTH", "500"))
+# Enough for a whole queue and the current track, so looping it loses nothing.
+HISTORY_LENGTH = int(getenv("HISTORY_LENGTH", str(MAX_QUEUE_LENGTH + 1)))
 
 
 class LoopType(Enum):
@@ -29,40 +43,204 @@ class LoopType(Enum):
 
 
 class Queue:
-    def __init__(self, maxlen: int) -> None:
-        # This does not use `maxlen` in deque, since then you lose the first item
-        # when appending.
-        self._stack: deque[tuple[Track, int]] = deque()
+    def __init__(self, maxlen: int, *, history_length: int = HISTORY_LENGTH) -> None:
+        # Holds slots in `_store`, tracks are only built when played or displayed.
+        self._store = TrackStore()
+        self._stack: IndexedList[int] = IndexedList(weight=self._store.length)
         self._maxlen = maxlen
         self._loop_type: LoopType | None = None
         self._loop_type_queue: LoopType | None = None
+        # Changes since the last `pop_journal`, `None` if not being recorded.
+        self._journal: list[Change] | None = None
+        self._journal_reset = False
+        # Position of each slot before the first shuffle, for `unshuffle`.
+        self._ranks: dict[int, int] = {}
+        self.shuffle_on_play = False
+        self.history = History(maxlen=history_length)
+        # `history.pushed` when the current loop of the queue started.
+        self._loop_start = 0
+        # Requesters in the order they get their next turn, `None` if not fair.
+        self._rotation: dict[int, None] | None = None
 
     @property
     def loop_type(self) -> LoopType | None:
         return self._loop_type
 
+    @property
+    def loop_queue_type(self) -> LoopType | None:
+        return self._loop_type_queue
+
+    @property
+    def fair_share(self) -> bool:
+        return self._rotation is not None
+
+    def _item(self, slot: int) -> tuple[Track, int]:
+        return self._store.track(slot), self._store.requester(slot)
+
+    def _insert(self, index: int, items: Sequence[tuple[Track, int]]) -> None:
+        # Resolve the index like `list.insert`, so the journal has the real one.
+        if index < 0:
+            index = max(index + len(self._stack), 0)
+        index = min(index, len(self._stack))
+
+        slots = [self._store.add(track, user) for track, user in items]
+        self._stack.insert_many(index, slots)
+        if self._rotation is not None:
+            for _, user in items:
+                self._rotation.setdefault(user)
+
+        if self._journal is not None:
+            records = [self._store.record(slot) for slot in slots]
+            self._journal.append(("i", index, records))
+
+    def _delete(self, start: int, stop: int) -> None:
+        if stop - start == 1:
+            slots = [self._stack.pop(start)]
+        else:
+            slots = list(self._stack.islice(start, stop))
+            self._stack.delete_range(start, stop)
+
+        for slot in slots:
+            user = self._store.requester(slot)
+            self._store.remove(slot)
+            self._ranks.pop(slot, None)
+            if self._rotation is not None and not self._store.requester_count(user):
+                self._rotation.pop(user, None)
+
+        if self._journal is not None:
+            self._journal.append(("d", start, stop))
+
+    def _remove(self, index: int) -> tuple[Track, int]:
+        if index < 0:
+            index += len(self._stack)
+
+        item = self._item(self._stack[index])
+        self._delete(index, index + 1)
+        return item
+
+    def _fair_index(self, user: int) -> int:
+        # The queue is in rounds, each with the next track of every requester in
+        # rotation order. A new track goes at the end of the requester's next
+        # round, after the requesters before them in that round.
+        assert self._rotation is not None
+        store = self._store
+        count = store.requester_count(user)
+        index = count
+        before = True
+        for other in self._rotation:
+            if other == user:
+                before = False
+                continue
+
+            index += min(store.requester_count(other), count + 1 if before else count)
+
+        return index
+
+    def _append(self, items: Sequence[tuple[Track, int]]) -> int:
+        # Adds to the end, or round-robin by requester with fair share.
+        if self._rotation is None:
+            index = len(self._stack)
+            self._insert(index, items)
+            return index
+
+        first = len(self._stack)
+        for track, user in items:
+            index = self._fair_index(user)
+            self._insert(index, [(track, user)])
+            first = min(first, index)
+
+        return first
+
+    def _move(self, source: int, destination: int) -> None:
+        self._stack.move(source, destination)
+
+        if self._journal is not None:
+            self._journal.append(("m", source, destination))
+
+    def reset_journal(self) -> None:
+        """Make the next :meth:`pop_journal` return ``None``."""
+
+        if self._journal is not None:
+            self._journal.clear()
+            self._journal_reset = True
+
+    def pop_journal(self) -> list[Change] | None:
+        """Collect the changes made since the last call.
+
+        Returns ``None`` on the first call, which starts recording, or if the
+        queue was changed in a way that cannot be replayed, such as a shuffle.
+        Either way, :meth:`records` should be saved instead.
+        """
+
+        journal = None if self._journal_reset else self._journal
+        self._journal = []
+        self._journal_reset = False
+        return journal
+
+    def records(self) -> list[Record]:
+        return [self._store.record(slot) for slot in self._stack]
+
+    def restore(
+        self,
+        items: Sequence[tuple[Track, int]],
+        *,
+        loop_type: LoopType | None,
+        loop_type_queue: LoopType | None,
+        looped: Sequence[tuple[Track, int]] = (),
+    ) -> None:
+        self.clear()
+        self._insert(0, items[: self._maxlen])
+        self._loop_type = loop_type
+        self._loop_type_queue = loop_type_queue
+        for track, user in looped:
+            self.history.push(track, user)
+        self._loop_start = self.history.pushed - len(looped)
+
     def loop_track(self, track: Track, *, user: int) -> None:
         if self._loop_type == LoopType.TRACK:
             return
         self._loop_type = LoopType.TRACK
-        self._stack.appendleft((track, user))
+        self._insert(0, [(track, user)])
 
     def loop_track_once(self, track: Track, *, user: int) -> None:
         if self._loop_type == LoopType.TRACK:
             try:
-                self._stack.popleft()
+                self._remove(0)
             except IndexError:
                 return
-        self._stack.appendleft((track, user))
+        self._insert(0, [(track, user)])
         self._loop_type = None
 
-    def loop_queue(self, *, current: Track, user: int) -> None:
+    def loop_queue(self) -> None:
+        # The loop starts at the current track, the last one in the history.
         self._loop_type_queue = LoopType.QUEUE
-        self._stack.append((current, user))
+        self._loop_start = max(self.history.pushed - 1, 0)
+
+    def looped(self) -> list[tuple[Track, int]]:
+        """The tracks played since the queue loop started, oldest first.
+
+        These are queued again when the queue runs out, and are empty if the
+        queue is not looping.
+        """
+
+        if self._loop_type_queue != LoopType.QUEUE:
+            return []
+
+        return self.history.since(self._loop_start)
+
+    def refill(self) -> None:
+        """Queue the tracks played since the loop started, if looping the queue
+        and nothing is left."""
+
+        if self._stack or self._loop_type_queue != LoopType.QUEUE:
+            return
+
+        self._append(self.history.since(self._loop_start)[: self._maxlen])
+        self._loop_start = self.history.pushed
 
     def disable_loop(self) -> None:
         try:
-            self._stack.popleft()
+            self._remove(0)
         except IndexError:
             return
         self._loop_type = None
@@ -70,20 +248,50 @@ class Queue:
     def disable_loop_queue(self) -> None:
         self._loop_type_queue = None
 
-    def extend(self, items: Sequence[tuple[Track, int]]) -> None:
+    def enable_fair_share(self) -> None:
+        """Take tracks round-robin by requester, instead of in the order added.
+
+        The queue is reordered into rounds once, later tracks are placed into
+        their round as they are added, so the queue always shows the play order.
+        """
+
+        users: dict[int, list[int]] = {}
+        for slot in self._stack:
+            users.setdefault(self._store.requester(slot), []).append(slot)
+
+        self._interleave(users)
+
+    def _interleave(self, users: dict[int, list[int]]) -> None:
+        # Rounds of each requester's next slot, in the order of `users`.
+        slots = [
+            slot
+            for turn in zip_longest(*users.values())
+            for slot in turn
+            if slot is not None
+        ]
+        self._stack = IndexedList(slots, weight=self._store.length)
+        self._rotation = dict.fromkeys(users)
+        self.reset_journal()
+
+    def disable_fair_share(self) -> None:
+        self._rotation = None
+
+    def extend(self, items: Sequence[tuple[Track, int]]) -> int:
+        """Add tracks to the queue, returning the index of the first one."""
+
         if (len(self._stack) + len(items)) > self._maxlen:
             items = items[: self._maxlen - len(self._stack)]
 
             if not items:
                 raise QueueFull
 
-        self._stack.extend(items)
+        return self._append(items)
 
     def add(self, track: Track, user: int) -> None:
         if len(self._stack) == self._maxlen:
             raise QueueFull
 
-        self._stack.append((track, user))
+        self._append([(track, user)])
 
     def __iadd__(self, other: Sequence[tuple[Track, int]]) -> Queue:
         self.extend(other)
@@ -92,22 +300,70 @@ class Queue:
     def __len__(self) -> int:
         return len(self._stack)
 
-    def take(self, skip: bool = False) -> tuple[Track, int]:
-        if self._loop_type_queue == LoopType.QUEUE:
-            item = self._stack.popleft()
-            self._stack.append(item)
-            return item
+    def __iter__(self) -> Iterator[Track]:
+        return map(self._store.track, self._stack)
 
-        if self._loop_type == LoopType.TRACK and not skip:
-            return self._stack[0]
+    def _next_index(self, *, front: bool = False) -> int:
+        if (
+            front
+            or not self.shuffle_on_play
+            or self._loop_type == LoopType.TRACK
+            or self._rotation is not None
+        ):
+            return 0
+
+        if not self._stack:
+            msg = "take from an empty queue"
+            raise IndexError(msg)
 
-        return self._stack.popleft()
+        return random.randrange(len(self._stack))
+
+    def take(self, skip: bool = False, *, front: bool = False) -> tuple[Track, int]:
+        """Remove and return the next track to play.
+
+        The next track is random with :attr:`shuffle_on_play`, unless ``front``
+        is set to take the first one, like a track just inserted to play now.
+        """
+
+        self.refill()
+        index = self._next_index(front=front)
+
+        if self._loop_type == LoopType.TRACK and not skip:
+            return self._item(self._stack[0])
+
+        track, user = self._remove(index)
+        if self._rotation is not None and user in self._rotation:
+            # Their next track is now behind everyone else's.
+            del self._rotation[user]
+            self._rotation[user] = None
+
+        return track, user
+
+    def skip(self, amount: int, *, front: bool = False) -> tuple[Track, int]:
+        """Remove the first ``amount - 1`` tracks and take the next one.
+
+        The one taken is picked like :meth:`take`, with the same ``front``.
+        """
+
+        if (
+            self._loop_type_queue is None
+            and self._loop_type != LoopType.TRACK
+            and (front or not self.shuffle_on_play)
+            and self._rotation is None
+        ):
+            item = self._item(self._stack[amount - 1])
+            self._delete(0, amount)
+            return item
 
-    def skip(self, amount: int) -> tuple[Track, int]:
         track = None
 
-        for _ in range(amount):
-            track = self.take(skip=True)
+        for i in range(amount):
+            # Only the track played is picked at random, the skipped ones are
+            # the ones in front of it.
+            track = self.take(skip=True, front=front or i < amount - 1)
+            if i < amount - 1 and self._loop_type_queue == LoopType.QUEUE:
+                # Skipped tracks were not played, so keep them in the loop.
+                self._append([track])
 
         assert track is not None
 
@@ -115,32 +371,186 @@ class Queue:
 
     @property
     def tracks(self) -> list[Track]:
-        return [track for track, _ in self._stack]
+        return list(self)
+
+    @property
+    def length(self) -> int:
+        """The total length of the queue in milliseconds."""
+
+        return self._stack.total
+
+    def requester_length(self, user: int) -> int:
+        """The total length of the tracks ``user`` has queued, in milliseconds."""
+
+        return self._store.requester_length(user)
+
+    def time_until(self, index: int) -> int:
+        """How long until the track at ``index`` plays, after the current one."""
+
+        return self._stack.prefix(index)
+
+    def page(self, start: int, stop: int) -> list[Track]:
+        return [self._store.track(slot) for slot in self._stack.islice(start, stop)]
 
     def clear(self) -> None:
         self._stack.clear()
+        self._store.clear()
+        self._ranks.clear()
+        if self._rotation is not None:
+            self._rotation = {}
+        self.reset_journal()
 
     def __getitem__(self, index: int) -> Track:
-        return self._stack[index][0]
+        return self._store.track(self._stack[index])
+
+    @property
+    def shuffled(self) -> bool:
+        return bool(self._ranks)
 
     def shuffle(self) -> None:
-        random.shuffle(self._stack)
+        # Shuffling a flat copy and rebuilding is O(n), swapping in place would
+        # locate every index in the blocks.
+        slots = list(self._stack)
+        if not self._ranks:
+            self._ranks = {slot: rank for rank, slot in enumerate(slots)}
+
+        random.shuffle(slots)
+        self._restack(slots)
+
+    def unshuffle(self) -> bool:
+        """Put the queue back in the order it was in before being shuffled.
+
+        Tracks added since go after the rest, in their current order.
+        Returns ``False`` if the queue is not shuffled.
+        """
+
+        if not self._ranks:
+            return False
+
+        ranks = self._ranks
+        after = max(ranks.values()) + 1
+        self._restack(sorted(self._stack, key=lambda slot: ranks.get(slot, after)))
+        self._ranks = {}
+        return True
+
+    def _restack(self, slots: list[int]) -> None:
+        # With fair share, only each requester's tracks are reordered, the
+        # rounds are kept.
+        if self._rotation is None:
+            self._stack = IndexedList(slots, weight=self._store.length)
+            self.reset_journal()
+            return
+
+        users: dict[int, list[int]] = {user: [] for user in self._rotation}
+        for slot in slots:
+            users[self._store.requester(slot)].append(slot)
+        self._interleave(users)
+
+    def previous(self) -> tuple[Track, int]:
+        """Go back a track, returning the one before the current track.
+
+        The current track is put back at the front of the queue.
+        """
+
+        if len(self.history) < 2:  # noqa: PLR2004
+            msg = "no previous track"
+            raise IndexError(msg)
+
+        current = self.history.pop()
+        item = self.history.pop()
+        # The loop cannot start after the tracks left in the history, it would
+        # have nothing to queue again.
+        self._loop_start = min(self._loop_start, self.history.pushed)
+        self._insert(0, [current])
+        return item
 
     def pop(self, index: int) -> None:
-        del self._stack[index]
+        self._remove(index)
+
+    def move(self, source: int, destination: int) -> Track:
+        self._move(source, destination)
+        return self[destination]
 
     def insert(self, index: int, track: Track, user: int) -> None:
         if len(self._stack) == self._maxlen:
             raise QueueFull
 
-        self._stack.insert(index, (track, user))
+        self._insert(index, [(track, user)])
+
+    def insert_many(self, index: int, items: Sequence[tuple[Track, int]]) -> None:
+        # Same truncation as `extend`, but nothing is inserted if none fit.
+        if (len(self._stack) + len(items)) > self._maxlen:
+            items = items[: self._maxlen - len(self._stack)]
+
+            if not items:
+                raise QueueFull
+
+        self._insert(index, items)
+
+    def unresolved(self, limit: int) -> list[tuple[int, str]]:
+        """The slots and URIs of tracks without an ID in the first ``limit``."""
+
+        store = self._store
+        return [
+            (slot, uri)
+            for slot in self._stack.islice(0, limit)
+            if not store.encoded(slot) and (uri := store.uri(slot))
+        ]
+
+    def resolve(self, slot: int, uri: str, track: Track) -> bool:
+        """Replace the track without an ID in ``slot`` with a loaded one.
+
+        Returns ``False`` if the slot no longer holds that track.
+        """
+
+        store = self._store
+        if store.encoded(slot) or store.uri(slot) != uri:
+            return False
+
+        index = next((i for i, s in enumerate(self._stack) if s == slot), None)
+        if index is None:
+            return False
+
+        # A new slot so the old length is still there to take off the totals.
+        # Not journaled, a snapshot of the placeholder is resolved again anyway.
+        new = self._stack[index] = store.add(track, store.requester(slot))
+        store.remove(slot)
+        if slot in self._ranks:
+            self._ranks[new] = self._ranks.pop(slot)
+
+        return True
+
+    def find(self, key: str) -> int | None:
+        """The index of the first track with the
+        :func:`~vibr.track_store.track_key` ``key``."""
+
+        store = self._store
+        return next(
+            (i for i, slot in enumerate(self._stack) if store.key(slot) == key),
+            None,
+        )
 
     def index(self, query: Track) -> int | None:
-        index = next(
-            (index for index, (track, _) in enumerate(self._stack) if track == query),
+        store = self._store
+        if query.id:
+            encoded = b64decode(query.id)
+            return next(
+                (
+                    i
+                    for i, slot in enumerate(self._stack)
+                    if store.encoded(slot) == encoded
+                ),
+                None,
+            )
+
+        return next(
+            (
+                i
+                for i, slot in enumerate(self._stack)
+                if not store.encoded(slot) and store.uri(slot) == query.uri
+            ),
             None,
         )
-        return index
 
 
 class Player(mafic.Player):
@@ -158,12 +568,9 @@ class Player(mafic.Player):
 
         self.queue: Queue = Queue(maxlen=MAX_QUEUE_LENGTH)
         self.notification_channel: Messageable | None = None
-
-        self.loop_track: Track | None = None
-        self.looped_user: int
-        self.loop_queue: list[Track] = []
-        self.loop_queue_check: bool = False
+        self.resolver = PlaylistResolver(self)
         self.dnd: bool = False
+        self.panel: LivePanel | None = None
 
         self._pause_timer: TimerHandle | None = None
         self._disconnect_timer: TimerHandle | None = None
@@ -190,13 +597,19 @@ class Player(mafic.Player):
         track: Track | str,
         /,
         *,
+        requester: int = 0,
         start_time: int | None = None,
         end_time: int | None = None,
         volume: int | None = None,
         replace: bool = True,
         pause: bool | None = None,
     ) -> None:
-        # Handle `/spotify playlists`` not having a lavalink ID.
+        if isinstance(track, Track):
+            self.queue.history.push(
+                track, requester, repeat=self.queue.loop_type == LoopType.TRACK
+            )
+
+        # Handle placeholders from lazy playlists not having a lavalink ID.
         if isinstance(track, Track) and not track.id:
             assert track.uri is not None
             track = track.uri
@@ -220,7 +633,9 @@ class Player(mafic.Player):
         else:
             self.cancel_disconnect_timer()
 
-        return await super().pause(pause)
+        await super().pause(pause)
+        if self.panel is not None:
+            self.panel.refresh()
 
     def stop(self) -> Coroutine[Any, Any, None]:
         self.start_disconnect_timer()
@@ -230,6 +645,9 @@ class Player(mafic.Player):
     def disconnect(self, *, force: bool = False) -> Coroutine[Any, Any, None]:
         self.cancel_pause_timer()
         self.cancel_disconnect_timer()
+        self.resolver.cancel()
+        if self.panel is not None:
+            self.panel.stop()
 
         return super().disconnect(force=force)
 
@@ -255,7 +673,12 @@ class Player(mafic.Player):
                     "I have paused the player."
                 ),
             )
-            await channel.send(embed=embed)
+            await outbox.run(
+                channel.id,
+                lambda: channel.send(embed=embed),
+                priority=Priority.NOTICE,
+                key="notice",
+            )
 
     async def _disconnect_task(self) -> None:
         await self.destroy()
@@ -269,7 +692,12 @@ class Player(mafic.Player):
                     "I have disconnected the player."
                 ),
             )
-            await channel.send(embed=embed)
+            await outbox.run(
+                channel.id,
+                lambda: channel.send(embed=embed),
+                priority=Priority.NOTICE,
+                key="notice",
+            )
 
     def start_pause_timer(self) -> None:
         if self.paused or not self.current:
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import json
+from asyncio import Semaphore, gather
+from base64 import b64decode, b64encode
+from logging import getLogger
+from typing import TYPE_CHECKING, Any
+
+from mafic import Track
+from nextcord import StageChannel, VoiceChannel
+
+from vibr.player import LoopType, Player
+from vibr.sharding import CURRENT_CLUSTER
+
+if TYPE_CHECKING:
+    from redis.asyncio.client import Pipeline
+
+    from vibr.bot import Vibr
+    from vibr.player import Change
+    from vibr.track_store import Record
+
+__all__ = ("PlayerSnapshots",)
+
+log = getLogger(__name__)
+
+STATES_KEY = "vibr:snapshots:{cluster}"
+QUEUE_KEY = "vibr:snapshots:queue:{guild}"
+DELTAS_KEY = "vibr:snapshots:queue:{guild}:deltas"
+LOOPED_KEY = "vibr:snapshots:queue:{guild}:looped"
+MAX_DELTAS = 50
+EXPIRY = 60 * 60 * 24
+RESTORE_CONCURRENCY = 10
+
+
+def dump_record(record: Record) -> list[Any]:
+    encoded, *rest = record
+    return [b64encode(encoded).decode(), *rest]
+
+
+def dump_track(track: Track, requester: int) -> list[Any]:
+    if track.id:
+        return [track.id, requester]
+
+    return [
+        "",
+        requester,
+        track.title,
+        track.author,
+        track.uri,
+        track.length,
+        track.source,
+    ]
+
+
+def dump_change(change: Change) -> list[Any]:
+    kind, index, value = change
+    if kind == "i":
+        assert isinstance(value, list)
+        return [kind, index, [dump_record(record) for record in value]]
+
+    return [kind, index, value]
+
+
+def apply_changes(records: list[Any], changes: list[Any]) -> None:
+    for kind, index, value in changes:
+        if kind == "i":
+            records[index:index] = value
+        elif kind == "d":
+            del records[index:value]
+        elif kind == "m":
+            records.insert(value, records.pop(index))
+
+
+class PlayerSnapshots:
+    """Write-behind snapshots of player state in Redis, restored on startup.
+
+    Queues journal their changes, which are written as one delta record per
+    flush, so a busy queue costs one write per interval rather than one per
+    change. After ``MAX_DELTAS`` records, or a change that cannot be replayed
+    such as a shuffle, the whole queue is written again.
+    """
+
+    def __init__(self, bot: Vibr) -> None:
+        self.bot = bot
+        self.key = STATES_KEY.format(cluster=CURRENT_CLUSTER)
+        # Last written state per guild, to skip writing unchanged players.
+        self._states: dict[int, str] = {}
+        self._deltas: dict[int, int] = {}
+        # `history.pushed` when the tracks played in a queue loop were written.
+        self._played: dict[int, int] = {}
+
+    def _state(self, player: Player) -> dict[str, Any]:
+        current = player.current
+        queue = player.queue
+        # The current track is the last one played.
+        last = queue.history.last(1)
+        requester = last[0][1] if last else 0
+        return {
+            "channel": getattr(player.channel, "id", None),
+            "text": getattr(player.notification_channel, "id", None),
+            "dnd": player.dnd,
+            "loop": queue.loop_type and queue.loop_type.name,
+            "loop_queue": queue.loop_queue_type and queue.loop_queue_type.name,
+            "shuffle": queue.shuffle_on_play,
+            "fair": queue.fair_share,
+            "current": current and dump_track(current, requester),
+            "paused": player.paused,
+        }
+
+    def _write(self, pipe: Pipeline, guild_id: int, player: Player) -> None:
+        queue = player.queue
+        queue_key = QUEUE_KEY.format(guild=guild_id)
+        deltas_key = DELTAS_KEY.format(guild=guild_id)
+        looped_key = LOOPED_KEY.format(guild=guild_id)
+
+        changes = queue.pop_journal()
+        deltas = self._deltas.get(guild_id, 0)
+
+        if changes is None or (changes and deltas >= MAX_DELTAS):
+            records = [dump_record(record) for record in queue.records()]
+            pipe.set(queue_key, json.dumps(records), ex=EXPIRY)
+            pipe.delete(deltas_key)
+            self._deltas[guild_id] = 0
+        elif changes:
+            pipe.rpush(deltas_key, json.dumps([dump_change(c) for c in changes]))
+            pipe.expire(deltas_key, EXPIRY)
+            pipe.expire(queue_key, EXPIRY)
+            pipe.expire(looped_key, EXPIRY)
+            self._deltas[guild_id] = deltas + 1
+
+        state = self._state(player)
+        compare = json.dumps(state)
+        if changes is None or changes or compare != self._states.get(guild_id):
+            # Position changes constantly, so only write it along other changes.
+            state["position"] = player.position
+            pipe.hset(self.key, str(guild_id), json.dumps(state))
+            self._states[guild_id] = compare
+
+        # Tracks played in the queue loop only change when another one plays.
+        looping = queue.loop_queue_type == LoopType.QUEUE
+        played = queue.history.pushed if looping else -1
+        if played != self._played.get(guild_id):
+            looped = queue.looped()
+            if looped and player.current is not None:
+                # Saved as the current track instead.
+                looped = looped[:-1]
+            if looped:
+                dumped = [dump_track(track, user) for track, user in looped]
+                pipe.set(looped_key, json.dumps(dumped), ex=EXPIRY)
+            else:
+                pipe.delete(looped_key)
+            self._played[guild_id] = played
+
+    def _forget(self, pipe: Pipeline, guild_id: int) -> None:
+        pipe.hdel(self.key, str(guild_id))
+        pipe.delete(QUEUE_KEY.format(guild=guild_id))
+        pipe.delete(DELTAS_KEY.format(guild=guild_id))
+        pipe.delete(LOOPED_KEY.format(guild=guild_id))
+        self._states.pop(guild_id, None)
+        self._deltas.pop(guild_id, None)
+        self._played.pop(guild_id, None)
+
+    async def flush(self) -> None:
+        players = {
+            player.guild.id: player
+            for player in self.bot.voice_clients
+            if isinstance(player, Player)
+        }
+        gone = self._states.keys() - players.keys()
+        if not players and not gone:
+            return
+
+        async with self.bot.redis.pipeline(transaction=False) as pipe:
+            for guild_id, player in players.items():
+                self._write(pipe, guild_id, player)
+
+            for guild_id in gone:
+                self._forget(pipe, guild_id)
+
+            try:
+                await pipe.execute()
+            except BaseException:
+                # The popped changes were not written, so write everything again.
+                for guild_id, player in players.items():
+                    player.queue.reset_journal()
+                    self._states.pop(guild_id, None)
+                    self._deltas.pop(guild_id, None)
+                    self._played.pop(guild_id, None)
+                for guild_id in gone:
+                    self._states[guild_id] = ""
+                raise
+
+    async def _load(self, records: list[Any]) -> list[Track]:
+        encoded = [b64decode(record[0]) for record in records if record[0]]
+        decoded = iter(await self.bot.decoder.decode(encoded))
+
+        return [
+            next(decoded)
+            if record[0]
+            else Track(
+                track_id="",
+                title=record[2],
+                author=record[3],
+                identifier=record[4] or "",
+                uri=record[4],
+                source=record[6],
+                stream=False,
+                seekable=True,
+                length=record[5],
+                artwork_url=None,
+                isrc=None,
+            )
+            for record in records
+        ]
+
+    async def _restore(self, guild_id: int, raw: bytes) -> bool:
+        data = json.loads(raw)
+
+        guild = self.bot.get_guild(guild_id)
+        if guild is None or guild.voice_client is not None:
+            return False
+
+        channel = guild.get_channel(data["channel"])
+        if not isinstance(channel, VoiceChannel | StageChannel):
+            return False
+
+        assert self.bot.user is not None
+        if not channel.voice_states.keys() - {self.bot.user.id}:
+            return False
+
+        queue_raw, deltas, looped_raw = await gather(
+            self.bot.redis.get(QUEUE_KEY.format(guild=guild_id)),
+            self.bot.redis.lrange(DELTAS_KEY.format(guild=guild_id), 0, -1),
+            self.bot.redis.get(LOOPED_KEY.format(guild=guild_id)),
+        )
+        records: list[Any] = json.loads(queue_raw) if queue_raw else []
+        looped: list[Any] = json.loads(looped_raw) if looped_raw else []
+        for delta in deltas:
+            apply_changes(records, json.loads(delta))
+
+        player = await channel.connect(cls=Player, timeout=2)
+        await self.bot.set_player_settings(player, channel.id)
+
+        current = [data["current"]] if data["current"] else []
+        tracks = await self._load(current + records + looped)
+        queued = tracks[len(current) : len(current) + len(records)]
+        played = tracks[len(current) + len(records) :]
+        player.queue.restore(
+            [(track, record[1]) for track, record in zip(queued, records, strict=True)],
+            loop_type=data["loop"] and LoopType[data["loop"]],
+            loop_type_queue=data["loop_queue"] and LoopType[data["loop_queue"]],
+            looped=[
+                (track, record[1]) for track, record in zip(played, looped, strict=True)
+            ],
+        )
+        player.queue.shuffle_on_play = data.get("shuffle", False)
+        if data.get("fair"):
+            player.queue.enable_fair_share()
+        player.resolver.schedule()
+        player.dnd = data["dnd"]
+        if data["text"] is not None:
+            player.notification_channel = guild.get_channel(
+                data["text"]
+            )  # pyright: ignore[reportGeneralTypeIssues]
+
+        if current:
+            await player.play(
+                tracks[0],
+                requester=current[0][1],
+                start_time=data["position"],
+                pause=data["paused"],
+            )
+
+        log.info("Restored player", extra={"guild": guild_id})
+        return True
+
+    async def restore(self) -> None:
+        states: dict[bytes, bytes] = await self.bot.redis.hgetall(self.key)
+        semaphore = Semaphore(RESTORE_CONCURRENCY)
+
+        async def restore_one(guild_id: int, raw: bytes) -> bool:
+            async with semaphore:
+                try:
+                    return await self._restore(guild_id, raw)
+                except Exception:
+                    log.warning(
+                        "Failed to restore player",
+                        exc_info=True,
+                        extra={"guild": guild_id},
+                    )
+                    return False
+
+        guild_ids = [int(guild_id) for guild_id in states]
+        restored = await gather(
+            *(
+                restore_one(guild_id, raw)
+                for guild_id, raw in zip(guild_ids, states.values(), strict=True)
+            )
+        )
+
+        # Anything not restored is stale, restored players are rewritten on flush.
+        async with self.bot.redis.pipeline(transaction=False) as pipe:
+            for guild_id, ok in zip(guild_ids, restored, strict=True):
+                if not ok:
+                    self._forget(pipe, guild_id)
+
+            await pipe.execute()
+
+        log.info("Restored %d of %d players", sum(restored), len(guild_ids))
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import json
+from asyncio import Semaphore, Task, create_task, gather, shield, sleep
+from hashlib import blake2b
+from logging import getLogger
+from os import getenv
+from typing import TYPE_CHECKING, Any
+
+from cachetools import TTLCache
+from mafic import Playlist, Track
+from prometheus_client import Counter
+
+from vibr.urls import parse_url
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from mafic import Node
+
+    from vibr.bot import Vibr
+
+__all__ = ("TrackCache", "normalise")
+
+log = getLogger(__name__)
+
+LOCAL_SIZE = int(getenv("TRACK_CACHE_SIZE", "2048"))
+TTL = int(getenv("TRACK_CACHE_TTL", str(60 * 60 * 6)))
+NEGATIVE_TTL = int(getenv("TRACK_CACHE_NEGATIVE_TTL", str(60 * 5)))
+WARM_CONCURRENCY = int(getenv("TRACK_CACHE_WARM_CONCURRENCY", "4"))
+WARM_RATE = float(getenv("TRACK_CACHE_WARM_RATE", "10"))
+KEY = "vibr:tracks:{digest}"
+
+Result = list[Track] | Playlist
+
+
+def normalise(query: str, search_type: str) -> tuple[str, str]:
+    """The cache key for a load, so equivalent searches share an entry.
+
+    Links lose their tracking parameters, searches ignore case and extra
+    whitespace.
+    """
+
+    if (link := parse_url(query)) is not None:
+        # Lavalink ignores the search type for URLs.
+        return "url", link.url
+
+    query = " ".join(query.split())
+
+    return search_type, query.casefold()
+
+
+def dump_track(track: Track) -> list[Any]:
+    return [
+        track.id,
+        track.title,
+        track.author,
+        track.identifier,
+        track.uri,
+        track.source,
+        track.stream,
+        track.seekable,
+        track.length,
+        track.artwork_url,
+        track.isrc,
+    ]
+
+
+def load_track(data: list[Any]) -> Track:
+    (
+        track_id,
+        title,
+        author,
+        identifier,
+        uri,
+        source,
+        stream,
+        seekable,
+        length,
+        artwork_url,
+        isrc,
+    ) = data
+    return Track(
+        track_id=track_id,
+        title=title,
+        author=author,
+        identifier=identifier,
+        uri=uri,
+        source=source,
+        stream=stream,
+        seekable=seekable,
+        length=length,
+        artwork_url=artwork_url,
+        isrc=isrc,
+    )
+
+
+def dump(result: Result) -> str:
+    if isinstance(result, Playlist):
+        return json.dumps(
+            {
+                "name": result.name,
+                "selected": result.selected_track,
+                "plugin": result.plugin_info,
+                "tracks": [dump_track(track) for track in result.tracks],
+            }
+        )
+
+    return json.dumps({"tracks": [dump_track(track) for track in result]})
+
+
+def load(raw: bytes) -> Result:
+    data = json.loads(raw)
+    tracks = [load_track(track) for track in data["tracks"]]
+    if "name" not in data:
+        return tracks
+
+    playlist = Playlist(
+        info={"name": data["name"], "selectedTrack": data["selected"]},
+        tracks=[],
+        plugin_info=data["plugin"],
+    )
+    playlist.tracks = tracks
+    return playlist
+
+
+class TrackCache:
+    """A two tier cache of track loads, in process and shared in Redis.
+
+    Searches with no results are cached too, for a shorter time. Failed loads
+    are not cached. Identical loads made while one is in flight wait for it
+    instead of loading again.
+    """
+
+    def __init__(self, bot: Vibr) -> None:
+        self.bot = bot
+        self._local: TTLCache[tuple[str, str], Result] = TTLCache(
+            maxsize=LOCAL_SIZE, ttl=TTL
+        )
+        # No results expire sooner, so they are kept apart.
+        self._empty: TTLCache[tuple[str, str], bool] = TTLCache(
+            maxsize=LOCAL_SIZE, ttl=NEGATIVE_TTL
+        )
+        self.requests = Counter(
+            "vibr_track_cache_requests",
+            "Track loads by the cache tier that answered them",
+            labelnames=["tier"],
+        )
+        self._in_flight: dict[tuple[str, str], Task[Result]] = {}
+        self.coalesced = Counter(
+            "vibr_track_cache_coalesced",
+            "Track loads that waited for an identical load in flight",
+        )
+
+    async def fetch_tracks(
+        self,
+        node: Node[Vibr] | None,
+        query: str,
+        *,
+        search_type: str,
+        hedge: bool = True,
+    ) -> Result:
+        """Load tracks like :meth:`mafic.Node.fetch_tracks`, through the cache.
+
+        If ``node`` is ``None``, the load goes to the node picked by
+        :attr:`Vibr.search_nodes`, hedged to a second node if it is slow and
+        ``hedge`` is ``True``. Returns an empty list instead of ``None`` if
+        nothing was found.
+        """
+
+        key = normalise(query, search_type)
+        if key[0] == "url":
+            query = key[1]
+
+        if (result := self._local.get(key)) is not None:
+            self.requests.labels("local").inc()
+            return result
+
+        if key in self._empty:
+            self.requests.labels("local").inc()
+            return []
+
+        if (task := self._in_flight.get(key)) is not None:
+            self.coalesced.inc()
+        else:
+            task = create_task(self._load(node, key, query, search_type, hedge))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # Shielded so one waiter timing out does not cancel it for the others.
+        return await shield(task)
+
+    async def _load(
+        self,
+        node: Node[Vibr] | None,
+        key: tuple[str, str],
+        query: str,
+        search_type: str,
+        hedge: bool,
+    ) -> Result:
+        redis_key = KEY.format(
+            digest=blake2b("\0".join(key).encode(), digest_size=20).hexdigest()
+        )
+        try:
+            raw = await self.bot.redis.get(redis_key)
+        except Exception:
+            log.warning("Could not read track cache", exc_info=True)
+            raw = None
+
+        if raw is not None:
+            self.requests.labels("redis").inc()
+            result = load(raw)
+            self._store(key, result)
+            return result
+
+        self.requests.labels("miss").inc()
+        if node is None:
+            result = await self.bot.search_nodes.run(
+                lambda picked: picked.fetch_tracks(query, search_type=search_type),
+                hedge=hedge,
+            )
+        else:
+            result = await node.fetch_tracks(query, search_type=search_type)
+        result = result or []
+        self._store(key, result)
+
+        try:
+            await self.bot.redis.set(
+                redis_key, dump(result), ex=TTL if result else NEGATIVE_TTL
+            )
+        except Exception:
+            log.warning("Could not write track cache", exc_info=True)
+
+        return result
+
+    async def warm(self, queries: Iterable[str], *, search_type: str) -> None:
+        """Load ``queries`` into the cache, a few at a time.
+
+        Loads start at most ``WARM_RATE`` a second, with at most
+        ``WARM_CONCURRENCY`` in flight, and are never hedged, so warming
+        leaves room for loads users are waiting on.
+        """
+
+        semaphore = Semaphore(WARM_CONCURRENCY)
+        tasks: list[Task[None]] = []
+        for query in queries:
+            await semaphore.acquire()
+            task = create_task(self._warm(query, search_type))
+            task.add_done_callback(lambda _: semaphore.release())
+            tasks.append(task)
+            await sleep(1 / WARM_RATE)
+
+        await gather(*tasks)
+
+    async def _warm(self, query: str, search_type: str) -> None:
+        try:
+            await self.fetch_tracks(None, query, search_type=search_type, hedge=False)
+        except Exception:
+            log.debug("Could not warm %s", query, exc_info=True)
+
+    def _store(self, key: tuple[str, str], result: Result) -> None:
+        if result:
+            self._local[key] = result
+        else:
+            self._empty[key] = True
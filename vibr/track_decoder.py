@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import struct
+from base64 import b64encode
+from hashlib import blake2b
+from logging import getLogger
+from os import getenv
+from struct import Struct
+from typing import TYPE_CHECKING, cast
+
+from cachetools import LRUCache
+from mafic import Track
+from prometheus_client import Counter
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from vibr.bot import Vibr
+
+__all__ = ("TrackDecodeError", "TrackDecoder", "decode_track")
+
+log = getLogger(__name__)
+
+CACHE_SIZE = int(getenv("DECODED_TRACK_CACHE_SIZE", "4096"))
+# Versions of the encoded track format that can be read here.
+VERSIONS = (1, 2, 3)
+VERSIONED = 1
+# The first versions with each set of optional fields.
+URI_VERSION = 2
+ARTWORK_VERSION = 3
+
+HEADER = Struct(">I")
+SHORT = Struct(">H")
+LONG = Struct(">q")
+
+
+class TrackDecodeError(ValueError):
+    """The track could not be read, it is malformed or a newer version."""
+
+
+def _java_utf(raw: bytes) -> str:
+    # Java writes NUL as two bytes and characters outside the BMP as surrogate
+    # pairs, which strict UTF-8 rejects.
+    text = raw.replace(b"\xc0\x80", b"\0").decode("utf-8", "surrogatepass")
+    return text.encode("utf-16", "surrogatepass").decode("utf-16")
+
+
+def _text(view: memoryview, pos: int) -> tuple[str, int]:
+    (size,) = SHORT.unpack_from(view, pos)
+    start = pos + SHORT.size
+    end = start + size
+    if end > len(view):
+        msg = "Text runs past the end of the track"
+        raise TrackDecodeError(msg)
+
+    try:
+        return str(view[start:end], "utf-8"), end
+    except UnicodeDecodeError:
+        return _java_utf(bytes(view[start:end])), end
+
+
+def _optional_text(view: memoryview, pos: int) -> tuple[str | None, int]:
+    if view[pos]:
+        return _text(view, pos + 1)
+
+    return None, pos + 1
+
+
+def decode_track(blob: bytes) -> Track:
+    """Read a track encoded by Lavalink, without asking Lavalink.
+
+    Parameters
+    ----------
+    blob:
+        The encoded track, as stored in :attr:`vibr.db.Song.lavalink_id`.
+
+    Raises
+    ------
+    TrackDecodeError
+        The track is malformed or its version is not supported.
+    """
+
+    view = memoryview(blob)
+    try:
+        (header,) = HEADER.unpack_from(view)
+        size = header & 0x3FFFFFFF
+        if size + HEADER.size > len(view):
+            msg = "Track is shorter than its header says"
+            raise TrackDecodeError(msg)
+
+        pos = HEADER.size
+        version = 1
+        if header >> 30 & VERSIONED:
+            version = view[pos]
+            pos += 1
+
+        if version not in VERSIONS:
+            msg = f"Unsupported track version {version}"
+            raise TrackDecodeError(msg)
+
+        title, pos = _text(view, pos)
+        author, pos = _text(view, pos)
+        (length,) = LONG.unpack_from(view, pos)
+        identifier, pos = _text(view, pos + LONG.size)
+        stream = bool(view[pos])
+        pos += 1
+        uri = artwork_url = isrc = None
+        if version >= URI_VERSION:
+            uri, pos = _optional_text(view, pos)
+        if version >= ARTWORK_VERSION:
+            artwork_url, pos = _optional_text(view, pos)
+            isrc, pos = _optional_text(view, pos)
+        source, pos = _text(view, pos)
+        # Source specific fields follow, the position is always last.
+        (position,) = LONG.unpack_from(view, HEADER.size + size - LONG.size)
+    except (IndexError, struct.error, ValueError) as e:
+        if isinstance(e, TrackDecodeError):
+            raise
+
+        msg = "Track is malformed"
+        raise TrackDecodeError(msg) from e
+
+    return Track(
+        track_id=b64encode(blob).decode(),
+        title=title,
+        author=author,
+        identifier=identifier,
+        uri=uri,
+        source=source,
+        stream=stream,
+        seekable=not stream,
+        length=length,
+        position=position,
+        artwork_url=artwork_url,
+        isrc=isrc,
+    )
+
+
+class TrackDecoder:
+    """Decodes stored tracks in process, remembering recent ones.
+
+    Tracks are cached by a hash of the encoded track. Tracks that
+    :func:`decode_track` cannot read are decoded by Lavalink instead.
+    """
+
+    def __init__(self, bot: Vibr) -> None:
+        self.bot = bot
+        self._cache: LRUCache[bytes, Track] = LRUCache(maxsize=CACHE_SIZE)
+        self.decodes = Counter(
+            "vibr_track_decodes",
+            "Tracks decoded, by where they were decoded",
+            labelnames=["path"],
+        )
+        self._cached = self.decodes.labels("cache")
+        self._local = self.decodes.labels("local")
+        self._lavalink = self.decodes.labels("lavalink")
+
+    async def decode(self, blobs: Sequence[bytes]) -> list[Track]:
+        """Decode tracks, in the same order as ``blobs``."""
+
+        tracks: list[Track | None] = []
+        # Index and key of the tracks Lavalink has to decode.
+        remote: list[tuple[int, bytes]] = []
+        local = 0
+        for blob in blobs:
+            key = blake2b(blob, digest_size=16).digest()
+            if (track := self._cache.get(key)) is None:
+                try:
+                    track = decode_track(blob)
+                except TrackDecodeError:
+                    log.debug("Decoding a track with Lavalink", exc_info=True)
+                    remote.append((len(tracks), key))
+                else:
+                    local += 1
+                    self._cache[key] = track
+
+            tracks.append(track)
+
+        self._local.inc(local)
+        self._cached.inc(len(tracks) - local - len(remote))
+        if remote:
+            encoded = [b64encode(blobs[index]).decode() for index, _ in remote]
+            decoded = await self.bot.search_nodes.run(
+                lambda node: node.decode_tracks(encoded)
+            )
+            self._lavalink.inc(len(remote))
+            for (index, key), track in zip(remote, decoded, strict=True):
+                tracks[index] = self._cache[key] = track
+
+        return cast("list[Track]", tracks)
@@ -1,30 +1,35 @@
 from __future__ import annotations
 
 import re
+from os import getenv
 from time import gmtime, strftime
+from typing import TYPE_CHECKING, NamedTuple
 
+from cachetools import LRUCache
 from mafic import Playlist, Track
-from nextcord.utils import escape_markdown
+from nextcord.utils import escape_markdown, utcnow
 
 from vibr.db import SongLog
 from vibr.embed import Embed
 from vibr.inter import Inter
+from vibr.urls import BANDCAMP_TRACK_RE, DISCORD_ATTACHMENT_RE, SONG_LINK_YOUTUBE
 from vibr.utils import truncate
+from vibr.write_behind import song_log
 
 from . import buttons
 
-__all__ = ("track_embed",)
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+__all__ = ("progress_bar", "track_embed")
 
 
 MAX_AUTHOR_LENGTH = 3
 HTTP_FOUND = 302
-BANDCAMP_TRACK_RE = re.compile(r"https://(\w+).bandcamp\.com/track/(\w+)")
-DISCORD_ATTACHMENT_RE = re.compile(
-    r"https?://(?:cdn|media)\.discordapp\.(?:com|net)/attachments/"
-    r"((?:[0-9]+)/(?:[0-9]+)/(?:\S+)+)",
-)
 SOUNDCLOUD_TRACK_RE = re.compile(r"soundcloud:tracks:(?P<id>\d+)")
 VIMEO_VIDEO = "https://vimeo.com/"
+DEFAULT_THUMBNAIL = "http://clipground.com/images/tone-duration-clipart-16.jpg"
+STATIC_CACHE_SIZE = int(getenv("EMBED_CACHE_SIZE", "1024"))
 
 
 def get_authors(tracks: list[Track]) -> str:
@@ -62,7 +67,7 @@ async def get_url(track: Track) -> str | None:
         return None
 
     if track.source == "youtube":
-        return f"https://song.link/y/{track.identifier}"
+        return f"{SONG_LINK_YOUTUBE}{track.identifier}"
 
     return track.uri
 
@@ -108,6 +113,94 @@ def get_type_and_identifier(track: Track) -> tuple[str, int]:  # noqa: PLR0911
     return track.uri, SongLog.Type.OTHER.value
 
 
+def progress_bar(position: int, length: int) -> str:
+    """Get a bar showing how far through a track ``position`` is.
+
+    Parameters
+    ----------
+    position:
+        The position in the track, in milliseconds.
+    length:
+        The length of the track, in milliseconds.
+    """
+
+    current = strftime("%H:%M:%S", gmtime(position // 1000))
+    if not length:
+        return current
+
+    total = strftime("%H:%M:%S", gmtime(length // 1000))
+    pos = round(min(position / length, 1) * 12)
+    line = (
+        ("\U00002501" * (pos - 1 if pos > 0 else 0))
+        + "\U000025cf"
+        + ("\U00002501" * (12 - pos))
+    )
+    # if 2/12, then get 1 before, then dot then 12 - 2 to pad to 12
+    return f"{current} {line} {total}"
+
+
+class StaticParts(NamedTuple):
+    title: str
+    authors: str
+    url: str | None
+    thumbnail: str
+    track_time: str
+
+
+static_parts: LRUCache[Hashable, StaticParts] = LRUCache(maxsize=STATIC_CACHE_SIZE)
+
+
+def _static_key(item: Track | Playlist) -> Hashable:
+    if isinstance(item, Playlist):
+        # Cheaper than hashing every track, and playlists are loaded whole.
+        # Placeholders from Spotify playlists have no ID, but a unique URI.
+        tracks = item.tracks
+        return (
+            item.name,
+            len(tracks),
+            (tracks[0].id or tracks[0].uri) if tracks else None,
+            (tracks[-1].id or tracks[-1].uri) if tracks else None,
+        )
+
+    # Placeholders have no ID, but their URI is unique.
+    return item.id, item.uri
+
+
+async def get_static_parts(item: Track | Playlist) -> StaticParts:
+    """Get the parts of a track's embed that do not depend on the call.
+
+    These are cached, as the same track is shown when it is queued, played
+    and skipped.
+    """
+
+    key = _static_key(item)
+    if (parts := static_parts.get(key)) is not None:
+        return parts
+
+    if isinstance(item, Playlist):
+        title = item.name
+        authors = get_authors(item.tracks)
+        length = sum(track.length for track in item.tracks)
+        url = None
+        thumbnail = item.plugin_info.get("artworkUrl", DEFAULT_THUMBNAIL)
+    else:
+        title = item.title
+        authors = item.author
+        length = item.length
+        url = await get_url(item)
+        thumbnail = item.artwork_url or DEFAULT_THUMBNAIL
+
+    parts = StaticParts(
+        title=escape_markdown(title),
+        authors=authors,
+        url=url,
+        thumbnail=thumbnail,
+        track_time=strftime("%H:%M:%S", gmtime(length / 1000)),
+    )
+    static_parts[key] = parts
+    return parts
+
+
 async def track_embed(
     item: Track | Playlist,
     *,
@@ -115,34 +208,15 @@ async def track_embed(
     inter: Inter | None = None,
     skipped: int | None = None,
     queued: int | None = None,
+    starts_in: int | None = None,
     looping: bool = False,
     next: bool = False,
     length_embed: bool = False,
     grabbed: bool = False,
+    log_play: bool = True,
 ) -> tuple[Embed, buttons.PlayButtons]:
     view = buttons.PlayButtons(item)
-
-    if isinstance(item, Playlist):
-        title = item.name
-        authors = get_authors(item.tracks)
-        length = sum(track.length for track in item.tracks)
-        track_time = strftime("%H:%M:%S", gmtime(length / 1000))
-        url = None
-        thumbnail = item.plugin_info.get(
-            "artworkUrl", "http://clipground.com/images/tone-duration-clipart-16.jpg"
-        )
-    else:
-        title = item.title
-        authors = item.author
-        length = item.length
-        track_time = strftime("%H:%M:%S", gmtime(length / 1000))
-        url = await get_url(item)
-        thumbnail = (
-            item.artwork_url
-            or "http://clipground.com/images/tone-duration-clipart-16.jpg"
-        )
-
-    title = escape_markdown(title)
+    title, authors, url, thumbnail, track_time = await get_static_parts(item)
 
     if skipped:
         embed = Embed(title=title)
@@ -160,18 +234,7 @@ async def track_embed(
         c = inter.guild.voice_client.position
 
         assert tr.length is not None
-        t = tr.length
-        current = strftime("%H:%M:%S", gmtime(c // 1000))
-        total = strftime("%H:%M:%S", gmtime(t // 1000))
-        pos = round(c / t * 12)
-        line = (
-            ("\U00002501" * (pos - 1 if pos > 0 else 0))
-            + "\U000025cf"
-            + ("\U00002501" * (12 - pos))
-        )
-        # if 2/12, then get 1 before, then dot then 12 - 2 to pad to 12
-        timing = f"{current} {line} {total}"
-        embed.description = timing
+        embed.description = progress_bar(c, tr.length)
 
     embed.set_author(name=authors, url=url)
 
@@ -180,23 +243,21 @@ async def track_embed(
     elif next:
         embed.set_footer(text=f"Playing Up Next | Length: {track_time}")
     elif queued:
-        embed.set_footer(
-            text=f"Queued - {queued} | " * bool(queued) + f"Length: {track_time}"
+        starts = (
+            f"Plays in {strftime('%H:%M:%S', gmtime(starts_in / 1000))} | "
+            if starts_in is not None
+            else ""
         )
+        embed.set_footer(text=f"Queued - {queued} | {starts}Length: {track_time}")
     else:
         embed.set_footer(text=f"Length: {track_time}")
     embed.set_thumbnail(url=thumbnail)
 
-    if not grabbed and isinstance(item, Track):
-        await SongLog.raw(
-            """INSERT INTO song_log (identifier, type, user_id)
-            VALUES ({}, {}, {})
-            ON CONFLICT (type, identifier, user_id)
-            DO UPDATE SET
-                amount = song_log.amount + 1
-            """,
-            *get_type_and_identifier(item),
-            user,
+    if log_play and not grabbed and isinstance(item, Track):
+        identifier, song_type = get_type_and_identifier(item)
+        song_log.add(
+            (song_type, identifier, user),
+            (item.title, item.author, item.uri, utcnow()),
         )
 
     return embed, view
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from array import array
+from base64 import b64decode, b64encode
+from hashlib import blake2b
+from sys import intern
+from typing import TYPE_CHECKING
+
+from mafic import Track
+
+if TYPE_CHECKING:
+    # `(id, requester)` for Lavalink tracks, with
+    # `(title, author, uri, length, source)` after it for tracks without an ID.
+    Record = tuple[bytes, int] | tuple[bytes, int, str, str, str | None, int, str]
+
+__all__ = ("TrackStore", "track_key")
+
+STREAM = 1
+SEEKABLE = 2
+
+
+def _key(encoded: bytes, uri: str | None) -> str:
+    # Placeholders have no ID, but their URI is unique.
+    return blake2b(encoded or (uri or "").encode(), digest_size=8).hexdigest()
+
+
+def track_key(track: Track) -> str:
+    """A short ID for a track, small enough for a component's ``custom_id``."""
+
+    return _key(b64decode(track.id) if track.id else b"", track.uri)
+
+
+class TrackStore:
+    """Columnar storage for tracks held by a queue.
+
+    Each track lives in a numbered slot, with every attribute in its own column.
+    Lavalink IDs are kept as raw bytes instead of base64, author/title/source
+    strings are interned so repeated artists share one object, and numbers live
+    in typed arrays instead of as boxed ints. :class:`mafic.Track` objects are
+    only created by :meth:`track`, when one is played or displayed.
+    """
+
+    __slots__ = (
+        "_ids",
+        "_titles",
+        "_authors",
+        "_identifiers",
+        "_uris",
+        "_sources",
+        "_artwork_urls",
+        "_isrcs",
+        "_lengths",
+        "_requesters",
+        "_flags",
+        "_free",
+        "_requester_counts",
+        "_requester_lengths",
+    )
+
+    def __init__(self) -> None:
+        self._ids: list[bytes] = []
+        self._titles: list[str] = []
+        self._authors: list[str] = []
+        self._identifiers: list[str] = []
+        self._uris: list[str | None] = []
+        self._sources: list[str] = []
+        self._artwork_urls: list[str | None] = []
+        self._isrcs: list[str | None] = []
+        self._lengths = array("Q")
+        self._requesters = array("Q")
+        self._flags = array("B")
+        self._free: list[int] = []
+        self._requester_counts: dict[int, int] = {}
+        self._requester_lengths: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids) - len(self._free)
+
+    def add(self, track: Track, requester: int) -> int:
+        """Store a track, returning the slot it was stored in."""
+
+        values = (
+            b64decode(track.id) if track.id else b"",
+            intern(track.title),
+            intern(track.author),
+            track.identifier,
+            track.uri,
+            intern(track.source),
+            track.artwork_url,
+            track.isrc,
+        )
+        flags = (STREAM if track.stream else 0) | (SEEKABLE if track.seekable else 0)
+        length = track.length or 0
+        counts, lengths = self._requester_counts, self._requester_lengths
+        counts[requester] = counts.get(requester, 0) + 1
+        lengths[requester] = lengths.get(requester, 0) + length
+
+        if self._free:
+            slot = self._free.pop()
+            (
+                self._ids[slot],
+                self._titles[slot],
+                self._authors[slot],
+                self._identifiers[slot],
+                self._uris[slot],
+                self._sources[slot],
+                self._artwork_urls[slot],
+                self._isrcs[slot],
+            ) = values
+            self._lengths[slot] = length
+            self._requesters[slot] = requester
+            self._flags[slot] = flags
+            return slot
+
+        slot = len(self._ids)
+        self._ids.append(values[0])
+        self._titles.append(values[1])
+        self._authors.append(values[2])
+        self._identifiers.append(values[3])
+        self._uris.append(values[4])
+        self._sources.append(values[5])
+        self._artwork_urls.append(values[6])
+        self._isrcs.append(values[7])
+        self._lengths.append(length)
+        self._requesters.append(requester)
+        self._flags.append(flags)
+        return slot
+
+    def remove(self, slot: int) -> None:
+        """Free a slot so it can be reused, dropping its references."""
+
+        requester = self._requesters[slot]
+        self._requester_counts[requester] -= 1
+        if self._requester_counts[requester]:
+            self._requester_lengths[requester] -= self._lengths[slot]
+        else:
+            del self._requester_counts[requester]
+            del self._requester_lengths[requester]
+
+        self._ids[slot] = b""
+        self._titles[slot] = self._authors[slot] = self._identifiers[slot] = ""
+        self._uris[slot] = self._artwork_urls[slot] = self._isrcs[slot] = None
+        self._free.append(slot)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def track(self, slot: int) -> Track:
+        """Materialise the track in a slot."""
+
+        encoded = self._ids[slot]
+        flags = self._flags[slot]
+        return Track(
+            track_id=b64encode(encoded).decode() if encoded else "",
+            title=self._titles[slot],
+            author=self._authors[slot],
+            identifier=self._identifiers[slot],
+            uri=self._uris[slot],
+            source=self._sources[slot],
+            stream=bool(flags & STREAM),
+            seekable=bool(flags & SEEKABLE),
+            length=self._lengths[slot],
+            artwork_url=self._artwork_urls[slot],
+            isrc=self._isrcs[slot],
+        )
+
+    def requester(self, slot: int) -> int:
+        return self._requesters[slot]
+
+    def length(self, slot: int) -> int:
+        return self._lengths[slot]
+
+    def requester_count(self, requester: int) -> int:
+        return self._requester_counts.get(requester, 0)
+
+    def requester_length(self, requester: int) -> int:
+        """The total length of the tracks a user has in this store."""
+
+        return self._requester_lengths.get(requester, 0)
+
+    def title(self, slot: int) -> str:
+        return self._titles[slot]
+
+    def author(self, slot: int) -> str:
+        return self._authors[slot]
+
+    def encoded(self, slot: int) -> bytes:
+        return self._ids[slot]
+
+    def uri(self, slot: int) -> str | None:
+        return self._uris[slot]
+
+    def key(self, slot: int) -> str:
+        """The :func:`track_key` of the track in a slot."""
+
+        return _key(self._ids[slot], self._uris[slot])
+
+    def record(self, slot: int) -> Record:
+        """A compact copy of a slot, enough to load the track again."""
+
+        if encoded := self._ids[slot]:
+            return encoded, self._requesters[slot]
+
+        return (
+            encoded,
+            self._requesters[slot],
+            self._titles[slot],
+            self._authors[slot],
+            self._uris[slot],
+            self._lengths[slot],
+            self._sources[slot],
+        )
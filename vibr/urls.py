@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+__all__ = (
+    "BANDCAMP_TRACK_RE",
+    "DISCORD_ATTACHMENT_RE",
+    "SONG_LINK_YOUTUBE",
+    "Link",
+    "get_uri",
+    "parse_url",
+)
+
+BANDCAMP_TRACK_RE = re.compile(r"https://(\w+).bandcamp\.com/track/(\w+)")
+DISCORD_ATTACHMENT_RE = re.compile(
+    r"https?://(?:cdn|media)\.discordapp\.(?:com|net)/attachments/"
+    r"((?:[0-9]+)/(?:[0-9]+)/(?:\S+)+)",
+)
+# Track embeds link YouTube tracks through Odesli.
+SONG_LINK_YOUTUBE = "https://song.link/y/"
+
+# Links pasted without a scheme, only for hosts known here.
+BARE_URL_RE = re.compile(
+    r"^(?:[\w-]+\.)*(?:youtube\.com|youtu\.be|spotify\.com|spotify\.link"
+    r"|soundcloud\.com|bandcamp\.com|apple\.com|deezer\.com|deezer\.page\.link)/",
+    re.IGNORECASE,
+)
+YOUTUBE_ID_RE = re.compile(r"^[\w-]{11}$")
+YOUTUBE_PATH_RE = re.compile(r"^/(?:shorts|embed|live|v)/(?P<id>[\w-]{11})")
+SPOTIFY_PATH_RE = re.compile(
+    r"^/(?:intl-[\w-]+/)?(?P<kind>track|album|playlist|artist|episode|show)"
+    r"/(?P<id>[A-Za-z0-9]+)"
+)
+DEEZER_PATH_RE = re.compile(
+    r"^/(?:[a-z]{2}/)?(?P<kind>track|album|playlist|artist)/(?P<id>\d+)"
+)
+# Short links only say where they lead once followed, which needs a request.
+# They are kept as they are and Lavalink follows them.
+SHORT_LINKS = {
+    "on.soundcloud.com": "soundcloud",
+    "spotify.link": "spotify",
+    "spotify.app.link": "spotify",
+    "deezer.page.link": "deezer",
+}
+
+
+class Link(NamedTuple):
+    source: str
+    """Where the link points, like ``"youtube"``, or ``"http"`` if unknown."""
+    url: str
+    """The link without tracking parameters, the same for equivalent links."""
+
+
+def _youtube(host: str, path: str, query: dict[str, str]) -> str | None:
+    if host == "youtu.be":
+        video = path.strip("/")
+    elif match := YOUTUBE_PATH_RE.match(path):
+        video = match.group("id")
+    elif path in ("/watch", "/playlist"):
+        video = query.get("v", "")
+    else:
+        return None
+
+    playlist = query.get("list")
+    if YOUTUBE_ID_RE.match(video):
+        params = {"v": video}
+        if playlist:
+            params["list"] = playlist
+        # Where to start playing.
+        if start := query.get("t"):
+            params["t"] = start
+        return f"https://www.youtube.com/watch?{urlencode(params)}"
+
+    if playlist:
+        return f"https://www.youtube.com/playlist?{urlencode({'list': playlist})}"
+
+    return None
+
+
+def _spotify(_: str, path: str, __: dict[str, str]) -> str | None:
+    if match := SPOTIFY_PATH_RE.match(path):
+        return f"https://open.spotify.com/{match['kind']}/{match['id']}"
+
+    return None
+
+
+def _soundcloud(_: str, path: str, __: dict[str, str]) -> str:
+    return f"https://soundcloud.com{path}"
+
+
+def _bandcamp(host: str, path: str, _: dict[str, str]) -> str:
+    return f"https://{host}{path}"
+
+
+def _apple_music(_: str, path: str, query: dict[str, str]) -> str:
+    # The `i` parameter picks a song out of an album.
+    if song := query.get("i"):
+        return f"https://music.apple.com{path}?{urlencode({'i': song})}"
+
+    return f"https://music.apple.com{path}"
+
+
+def _deezer(_: str, path: str, __: dict[str, str]) -> str | None:
+    if match := DEEZER_PATH_RE.match(path):
+        return f"https://www.deezer.com/{match['kind']}/{match['id']}"
+
+    return None
+
+
+# The source and canonical URL of links to each host, if the link is understood.
+HOSTS: dict[str, tuple[str, Callable[[str, str, dict[str, str]], str | None]]] = {
+    "youtube.com": ("youtube", _youtube),
+    "music.youtube.com": ("youtube", _youtube),
+    "youtu.be": ("youtube", _youtube),
+    "open.spotify.com": ("spotify", _spotify),
+    "soundcloud.com": ("soundcloud", _soundcloud),
+    "music.apple.com": ("applemusic", _apple_music),
+    "deezer.com": ("deezer", _deezer),
+}
+
+
+def parse_url(query: str) -> Link | None:
+    """Classify a link and drop its tracking parameters.
+
+    Links to the same track, like ``youtu.be/x`` and
+    ``https://music.youtube.com/watch?v=x&si=y``, give the same URL. Short
+    links, like ``spotify.link/x``, are kept as they are.
+
+    Parameters
+    ----------
+    query:
+        What the user searched for.
+
+    Returns
+    -------
+    Link | None
+        The link, or ``None`` if ``query`` is not a link.
+    """
+
+    query = query.strip()
+    if BARE_URL_RE.match(query):
+        query = f"https://{query}"
+
+    try:
+        parts = urlsplit(query)
+    except ValueError:
+        return None
+
+    if parts.scheme not in ("http", "https") or not parts.netloc or " " in query:
+        return None
+
+    host = parts.hostname or ""
+    host = host.removeprefix("www.").removeprefix("m.")
+    if (source := SHORT_LINKS.get(host)) is not None:
+        return Link(source, query)
+
+    if host.endswith(".bandcamp.com"):
+        source, canonical = "bandcamp", _bandcamp
+    else:
+        source, canonical = HOSTS.get(host, ("http", None))
+
+    path = parts.path.rstrip("/") or "/"
+    if canonical is not None and (
+        url := canonical(host, path, dict(parse_qsl(parts.query)))
+    ):
+        return Link(source, url)
+
+    # The query parameters sign the link, so it is kept as it is.
+    if DISCORD_ATTACHMENT_RE.match(query):
+        return Link("discord", query)
+
+    return Link("http", query)
+
+
+def get_uri(url: str) -> str:
+    """Get a track's URI back from the URL a track embed links it with.
+
+    Parameters
+    ----------
+    url:
+        The URL, as linked by a track embed's author.
+    """
+
+    if url.startswith(SONG_LINK_YOUTUBE):
+        return f"https://www.youtube.com/watch?v={url.removeprefix(SONG_LINK_YOUTUBE)}"
+
+    return url
@@ -8,6 +8,7 @@ from nextcord.ui import Button, Select, View
 
 from vibr.embed import Embed
 from vibr.inter import Inter
+from vibr.outbox import Priority, outbox
 from vibr.utils import truncate
 
 if TYPE_CHECKING:
@@ -25,8 +26,15 @@ class TimeoutView(View):
             if isinstance(child, Button | Select):
                 child.disabled = True
 
-        if self.message is not None:
-            await self.message.edit(view=self)
+        if (message := self.message) is not None:
+            channel = (
+                message.channel_id
+                if isinstance(message, Inter)
+                else getattr(message.channel, "id", None)
+            )
+            await outbox.run(
+                channel, lambda: message.edit(view=self), priority=Priority.EDIT
+            )
 
 
 class SearchSelect(Select["SearchView"]):
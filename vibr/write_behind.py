@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from asyncio import Lock
+from itertools import groupby
+from os import getenv
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+from botbase.db import CommandLog
+from prometheus_client import Counter, Gauge, Histogram
+
+from vibr.db import SongLog
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Sequence
+
+    from piccolo.table import Table
+
+__all__ = ("WriteBehind", "command_log", "song_log")
+
+# Rows per statement, well under Postgres' limit on parameters.
+BATCH_SIZE = int(getenv("WRITE_BEHIND_BATCH_SIZE", "1000"))
+
+pending_rows = Gauge(
+    "vibr_write_behind_pending",
+    "Rows waiting to be written",
+    labelnames=["table"],
+)
+flush_time = Histogram(
+    "vibr_write_behind_flush_seconds",
+    "Time taken to write buffered rows",
+    labelnames=["table"],
+)
+written_rows = Counter(
+    "vibr_write_behind_rows",
+    "Rows written, after merging increments to the same row",
+    labelnames=["table"],
+)
+increments = Counter(
+    "vibr_write_behind_increments",
+    "Increments buffered",
+    labelnames=["table"],
+)
+
+
+class WriteBehind:
+    """Sums ``amount`` increments in memory and upserts them in batches.
+
+    Increments to the same row are merged into one, so a row played or used
+    many times between flushes is written once. Rows that fail to write are
+    kept for the next flush.
+
+    A unique constraint never matches ``NULL``, so rows with a ``NULL`` key are
+    written apart from the rest: an update of the row found with ``IS NULL``,
+    then an insert if there was none.
+
+    Parameters
+    ----------
+    table:
+        The table to write to.
+    keys:
+        The columns of the unique constraint the increments are counted by.
+    values:
+        Other columns to write, the latest value of each is kept.
+    """
+
+    def __init__(
+        self,
+        table: type[Table],
+        *,
+        keys: Sequence[str],
+        values: Sequence[str] = (),
+    ) -> None:
+        self.table = table
+        self.name = table._meta.tablename
+        self.keys = tuple(keys)
+        self.values = tuple(values)
+        self.columns = (*keys, *values)
+        # Only table and column names from the code are put in the SQL, every
+        # value is passed as a parameter.
+        self._sql = (
+            f"INSERT INTO {self.name} ({', '.join(self.columns)}, amount) "  # noqa: S608
+            "VALUES {rows} "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+            + ", ".join(
+                [
+                    f"amount = {self.name}.amount + EXCLUDED.amount",
+                    *(f"{column} = EXCLUDED.{column}" for column in values),
+                ]
+            )
+        )
+        # SQL for rows with `NULL` keys, by which keys are `NULL`.
+        self._null_sql: dict[tuple[bool, ...], str] = {}
+        # Latest values and summed amount, by key.
+        self._pending: dict[tuple[Hashable, ...], tuple[tuple[Any, ...], int]] = {}
+        self._lock = Lock()
+        pending_rows.labels(self.name).set_function(lambda: len(self._pending))
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(
+        self, key: tuple[Hashable, ...], values: tuple[Any, ...] = (), amount: int = 1
+    ) -> None:
+        """Buffer an increment of ``amount`` to the row with ``key``."""
+
+        if (current := self._pending.get(key)) is not None:
+            amount += current[1]
+
+        self._pending[key] = (values, amount)
+        increments.labels(self.name).inc()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far."""
+
+        async with self._lock:
+            if not self._pending:
+                return
+
+            # Rows with the same keys `NULL` are written together.
+            items = sorted(self._pending.items(), key=lambda item: _nulls(item[0]))
+            self._pending = {}
+            written = 0
+            start = perf_counter()
+            try:
+                for nulls, group in groupby(items, key=lambda item: _nulls(item[0])):
+                    group = list(group)  # noqa: PLW2901
+                    for offset in range(0, len(group), BATCH_SIZE):
+                        batch = group[offset : offset + BATCH_SIZE]
+                        await self._write(
+                            [
+                                (*_present(key), *values, amount)
+                                for key, (values, amount) in batch
+                            ],
+                            nulls,
+                        )
+                        written += len(batch)
+                        written_rows.labels(self.name).inc(len(batch))
+            except Exception:
+                self._restore(items[written:])
+                raise
+            finally:
+                flush_time.labels(self.name).observe(perf_counter() - start)
+
+    def _restore(
+        self, items: list[tuple[tuple[Hashable, ...], tuple[tuple[Any, ...], int]]]
+    ) -> None:
+        # Anything buffered since the flush started has newer values.
+        for key, (values, amount) in items:
+            if (current := self._pending.get(key)) is not None:
+                self._pending[key] = (current[0], current[1] + amount)
+            else:
+                self._pending[key] = (values, amount)
+
+    async def _write(
+        self, rows: list[tuple[Any, ...]], nulls: tuple[bool, ...]
+    ) -> None:
+        if any(nulls):
+            sql = self._null_sql.get(nulls) or self._build_null_sql(nulls)
+            # Parameters in a CTE are not typed by the columns they go into.
+            cast = [
+                f"{{}}::{self.table._meta.get_column_by_name(column).column_type}"
+                for column in (*_present(self.keys, nulls), *self.values)
+            ]
+            row = "(" + ", ".join([*cast, "{}::BIGINT"]) + ")"
+        else:
+            sql = self._sql
+            row = "(" + ", ".join(["{}"] * len(rows[0])) + ")"
+
+        await self.table.raw(
+            # Only adds `{}` placeholders, the rows are parameters.
+            sql.format(rows=", ".join([row] * len(rows))),
+            *(value for row in rows for value in row),
+        )
+
+    def _build_null_sql(self, nulls: tuple[bool, ...]) -> str:
+        name = self.name
+        keys = _present(self.keys, nulls)
+        existing = " AND ".join(
+            f"existing.{key} IS NULL" if null else f"existing.{key} = rows.{key}"
+            for key, null in zip(self.keys, nulls, strict=True)
+        )
+        updates = ", ".join(
+            [
+                f"amount = {name}.amount + rows.amount",
+                *(f"{column} = rows.{column}" for column in self.values),
+            ]
+        )
+        inserts = ", ".join(
+            [
+                *(
+                    "NULL" if null else f"rows.{key}"
+                    for key, null in zip(self.keys, nulls, strict=True)
+                ),
+                *(f"rows.{column}" for column in self.values),
+                "rows.amount",
+            ]
+        )
+        updated = " AND ".join(f"updated.{key} = rows.{key}" for key in keys) or "TRUE"
+        # Only the first row found is updated, in case earlier inserts left
+        # more than one for a key.
+        sql = (
+            f"WITH rows ({', '.join([*keys, *self.values, 'amount'])}) "  # noqa: S608
+            "AS (VALUES {rows}), "
+            f"updated AS (UPDATE {name} SET {updates} FROM rows "
+            f"WHERE {name}.ctid = (SELECT ctid FROM {name} AS existing "
+            f"WHERE {existing} LIMIT 1) RETURNING rows.*) "
+            f"INSERT INTO {name} ({', '.join([*self.columns, 'amount'])}) "
+            f"SELECT {inserts} FROM rows "
+            f"WHERE NOT EXISTS (SELECT FROM updated WHERE {updated})"
+        )
+        self._null_sql[nulls] = sql
+        return sql
+
+
+def _nulls(key: tuple[Hashable, ...]) -> tuple[bool, ...]:
+    return tuple(value is None for value in key)
+
+
+def _present(
+    key: Sequence[Any], nulls: tuple[bool, ...] | None = None
+) -> tuple[Any, ...]:
+    if nulls is None:
+        nulls = _nulls(key)
+
+    return tuple(value for value, null in zip(key, nulls, strict=True) if not null)
+
+
+song_log = WriteBehind(
+    SongLog,
+    keys=("type", "identifier", "user_id"),
+    values=("title", "author", "uri", "last_played"),
+)
+command_log = WriteBehind(CommandLog, keys=("command", "guild", "channel", "member"))